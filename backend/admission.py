@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from fastapi import HTTPException, status
+
+# Request classes, lower runs first
+INTERACTIVE = 0  # chat: a teacher is watching the screen
+BACKGROUND = 1   # feedback analysis jobs
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded priority wait queue in front of it.
+
+    - Up to `limit` calls run at once; the rest wait, interactive before
+      background and first come first served within a class.
+    - At most `queue_limit` callers wait. When the queue is full a new
+      caller is rejected at once with 503, unless it outranks a waiter, in
+      which case the newest lowest-priority waiter is shed instead.
+    - A waiter that is not admitted before its deadline gets 503 too.
+
+    The 503s carry a Retry-After estimated from the recent service time, so
+    under overload clients back off instead of all timing out together.
+    """
+
+    def __init__(self, limit, queue_limit):
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.active = 0
+        self._heap = []  # (priority, seq, future); cancelled futures are skipped
+        self._waiting = 0
+        self._seq = itertools.count()
+        self.service_time = 1.0  # moving average, seconds
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.shed = 0
+
+    def retry_after(self):
+        return max(1, math.ceil(self.service_time * (self._waiting + 1) / self.limit))
+
+    def overloaded(self, reason):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI service busy ({reason}), please try again",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    def _shed_for(self, priority):
+        """Drop the newest waiter of a lower priority class, if any."""
+        victims = [e for e in self._heap if not e[2].done() and e[0] > priority]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda e: (e[0], e[1]))
+        victim[2].set_exception(self.overloaded("queue full"))
+        self._waiting -= 1
+        self.shed += 1
+        return True
+
+    def check(self, priority=INTERACTIVE):
+        """Raise the 503 that acquire() would raise right now, without queueing."""
+        if self.active < self.limit or self._waiting < self.queue_limit:
+            return
+        if any(not e[2].done() and e[0] > priority for e in self._heap):
+            return
+        self.rejected += 1
+        raise self.overloaded("queue full")
+
+    async def acquire(self, priority=INTERACTIVE, timeout=None):
+        if self.active < self.limit and self._waiting == 0:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self._waiting >= self.queue_limit and not self._shed_for(priority):
+            self.rejected += 1
+            raise self.overloaded("queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                if future.exception() is not None:
+                    raise future.exception()  # shed just as the deadline passed
+                return  # admitted just as the deadline passed; keep the slot
+            future.cancel()
+            self._waiting -= 1
+            self.timed_out += 1
+            raise self.overloaded("queue wait exceeded")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()  # hand on the slot we were just given
+            elif not future.done():
+                future.cancel()
+                self._waiting -= 1
+            raise
+        # A shed waiter's future carries the 503 and raises above
+
+    def release(self, elapsed=None):
+        if elapsed is not None:
+            self.service_time += 0.2 * (elapsed - self.service_time)
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue  # timed out, cancelled or shed
+            self._waiting -= 1
+            self.admitted += 1
+            future.set_result(True)  # the slot passes straight to the waiter
+            return
+        self.active -= 1
+
+    async def run(self, func, priority=INTERACTIVE, timeout=None):
+        """Await `func()` inside an admitted slot."""
+        await self.acquire(priority, timeout)
+        start = time.perf_counter()
+        try:
+            return await func()
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queue_limit": self.queue_limit,
+            "active": self.active,
+            "waiting": self._waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "shed": self.shed,
+            "service_time_ms": round(self.service_time * 1000, 1),
+        }
@@ -0,0 +1,92 @@
+import asyncio
+import os
+from datetime import datetime
+import httpx
+from fastapi import Request
+from google import genai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HF_POOL_SIZE = int(os.getenv("HF_POOL_SIZE", 20))
+# Point at a local stand-in (see hf_standin.py) to run without the real API
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE")
+# On reconnect the old httpx client is closed only after requests already
+# using it have had this long to finish (matches its 60 s timeout)
+HTTP_RETIRE_SECONDS = float(os.getenv("HTTP_RETIRE_SECONDS", 60))
+
+
+class AIClients:
+    """
+    Provider clients shared by every request of a worker, built once in the
+    app lifespan. The httpx client keeps its Hugging Face connection pool
+    and TLS sessions warm between requests. The Gemini client is shared but
+    does not pool: google-genai 0.3.0 opens a new requests.Session for every
+    call, so each Gemini request still pays its own TCP and TLS handshake.
+    """
+
+    def __init__(self):
+        self.gemini = None
+        self.http = None
+        self.gemini_error = None
+        self.connected_at = None
+        self._retiring = set()
+
+    def connect(self):
+        gemini_key = os.getenv("GEMINI_API_KEY")
+        self.gemini = None
+        self.gemini_error = None
+        if gemini_key:
+            try:
+                http_options = {"base_url": GEMINI_API_BASE} if GEMINI_API_BASE else None
+                self.gemini = genai.Client(api_key=gemini_key, http_options=http_options)
+            except Exception as e:
+                print(f"Gemini Client Init Error: {e}")
+                self.gemini_error = str(e)
+        else:
+            print("Warning: GEMINI_API_KEY not found in env")
+            self.gemini_error = "GEMINI_API_KEY missing"
+
+        hf_key = os.getenv("HF_API_KEY")
+        self.http = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {hf_key}"} if hf_key else {},
+            limits=httpx.Limits(max_connections=HF_POOL_SIZE, max_keepalive_connections=HF_POOL_SIZE),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        self.connected_at = datetime.utcnow()
+
+    async def close(self):
+        for task in list(self._retiring):
+            task.cancel()
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+        self.gemini = None
+
+    async def _retire(self, http):
+        try:
+            await asyncio.sleep(HTTP_RETIRE_SECONDS)
+        finally:
+            await http.aclose()
+
+    async def reconnect(self):
+        # New clients go in first; translations still holding the old httpx
+        # client finish on it before it is closed
+        old_http = self.http
+        self.connect()
+        if old_http is not None:
+            task = asyncio.create_task(self._retire(old_http))
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+
+    def health(self):
+        return {
+            "gemini": "ok" if self.gemini else "unavailable",
+            "gemini_error": self.gemini_error,
+            "http": "ok" if self.http is not None and not self.http.is_closed else "closed",
+            "connected_at": self.connected_at.isoformat() if self.connected_at else None,
+        }
+
+
+def get_ai_clients(request: Request) -> AIClients:
+    return request.app.state.ai_clients
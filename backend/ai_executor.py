@@ -0,0 +1,232 @@
+import asyncio
+import functools
+import hashlib
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from google.genai import errors as genai_errors
+import deadlines
+from admission import AdmissionController, INTERACTIVE
+from resilience import CircuitOpen, Resilience
+from singleflight import SingleFlight
+
+load_dotenv()
+
+# The google-genai SDK call is blocking, so every Gemini request runs on a
+# dedicated thread pool. The admission controller caps how many calls are in
+# flight and makes the rest wait on the event loop, chat ahead of background
+# analysis, instead of piling up inside the pool. Past AI_QUEUE_LIMIT
+# waiters, or AI_QUEUE_TIMEOUT seconds of waiting, callers get a 503.
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", 8))
+AI_QUEUE_LIMIT = int(os.getenv("AI_QUEUE_LIMIT", 32))
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", 10))
+# Background jobs are retried anyway, so they can afford to wait longer
+AI_BACKGROUND_QUEUE_TIMEOUT = float(os.getenv("AI_BACKGROUND_QUEUE_TIMEOUT", 60))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+_executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY, thread_name_prefix="gemini")
+admission = AdmissionController(AI_MAX_CONCURRENCY, AI_QUEUE_LIMIT)
+# Identical requests in flight at the same time (a staff room asking the
+# same question, a double-submitted form) share one upstream call.
+AI_COALESCE = os.getenv("AI_COALESCE", "1") != "0"
+_coalescer = SingleFlight()
+
+
+def gemini_retryable(error):
+    """Rate limits, server errors and network failures; never bad requests."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or (error.code or 0) >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+# Hedging duplicates a paid call, so for Gemini it is off unless asked for
+gemini_resilience = Resilience(
+    "gemini",
+    gemini_retryable,
+    attempts=int(os.getenv("GEMINI_RETRIES", 3)),
+    hedge=os.getenv("GEMINI_HEDGE", "0") == "1",
+    breaker_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", 5)),
+    breaker_reset=float(os.getenv("GEMINI_BREAKER_RESET", 30)),
+)
+
+
+def unavailable(error: CircuitOpen):
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="AI service is temporarily unavailable, please try again",
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+
+def queue_timeout(priority):
+    return AI_QUEUE_TIMEOUT if priority == INTERACTIVE else AI_BACKGROUND_QUEUE_TIMEOUT
+
+
+async def admit(priority):
+    """Wait for a slot, for no longer than the request has left."""
+    deadlines.check()
+    try:
+        await admission.acquire(priority, deadlines.budget(queue_timeout(priority)))
+    except HTTPException:
+        if deadlines.expired():
+            raise deadlines.DeadlineExceeded()
+        raise
+
+
+async def run_blocking(func, *args, priority=INTERACTIVE, **kwargs):
+    """
+    Run a blocking AI SDK call in the pool once admitted. The SDK has no
+    per-call timeout, so once the request's deadline passes the caller
+    stops waiting and gets a 504; the pool thread cannot be interrupted
+    and keeps the admission slot until the SDK call actually returns.
+    """
+    loop = asyncio.get_running_loop()
+    await admit(priority)
+    start = time.perf_counter()
+    future = loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    try:
+        return await deadlines.within(asyncio.shield(future))
+    finally:
+        if future.done():
+            admission.release(time.perf_counter() - start)
+        else:
+            # Abandoned (deadline or client gone): free the slot on return
+            future.add_done_callback(lambda _: admission.release(time.perf_counter() - start))
+
+
+def request_key(contents, config, model):
+    """
+    Coalescing key for a request, or None when it cannot be keyed cheaply
+    (e.g. it carries an image). Prompt whitespace is normalized.
+    """
+    parts = contents if isinstance(contents, list) else [contents]
+    if not all(isinstance(part, str) for part in parts):
+        return None
+    if config is None:
+        config_key = ""
+    elif hasattr(config, "model_dump_json"):
+        config_key = config.model_dump_json(exclude_none=True)
+    else:
+        config_key = repr(config)
+    prompt = "\x1f".join(" ".join(part.split()) for part in parts)
+    return hashlib.sha256(f"{model}\x1e{config_key}\x1e{prompt}".encode("utf-8")).hexdigest()
+
+
+async def generate_content(client, contents, config=None, model=GEMINI_MODEL, priority=INTERACTIVE):
+    call = functools.partial(
+        run_blocking,
+        client.models.generate_content,
+        model=model,
+        contents=contents,
+        config=config,
+        priority=priority
+    )
+    resilient = functools.partial(gemini_resilience.call, call)
+    key = request_key(contents, config, model) if AI_COALESCE else None
+    try:
+        if key is None:
+            return await resilient()
+        return await _coalescer.do((id(client), key), resilient)
+    except CircuitOpen as e:
+        raise unavailable(e)
+
+
+async def _stream_once(client, contents, config, model):
+    """
+    Yield text chunks from generate_content_stream as soon as the SDK
+    produces them. The blocking iterator is drained on a pool thread and
+    handed back to the loop through a queue; closing this generator (e.g.
+    the HTTP client went away) stops the producer at the next chunk.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    cancelled = False
+
+    def produce():
+        try:
+            for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+                if cancelled:
+                    break
+                if chunk.text:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    await admit(INTERACTIVE)
+    start = time.perf_counter()
+    producer = loop.run_in_executor(_executor, produce)
+    try:
+        while True:
+            item = await deadlines.within(queue.get())
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await producer
+    finally:
+        cancelled = True
+        if producer.done():
+            admission.release(time.perf_counter() - start)
+        else:
+            # The producer notices at its next chunk; keep the slot until then
+            producer.add_done_callback(lambda _: admission.release(time.perf_counter() - start))
+
+
+async def stream_content(client, contents, config=None, model=GEMINI_MODEL):
+    """
+    _stream_once under the Gemini circuit breaker. A stream that fails
+    before its first chunk is retried like any other call; once text has
+    reached the client a failure can only be reported.
+    """
+    breaker = gemini_resilience.breaker
+    for attempt in range(gemini_resilience.attempts):
+        try:
+            trial = breaker.allow()
+        except CircuitOpen as e:
+            raise unavailable(e)
+        started = False
+        settled = False
+        try:
+            deadlines.check()
+            async for text in _stream_once(client, contents, config, model):
+                started = True
+                yield text
+            settled = True
+            breaker.success()
+            return
+        except Exception as e:
+            settled = True
+            if not gemini_retryable(e):
+                breaker.cancelled(trial)
+                raise
+            breaker.failure()
+            delay = gemini_resilience.backoff(attempt)
+            if started or attempt == gemini_resilience.attempts - 1 or deadlines.budget(delay) < delay:
+                raise
+            gemini_resilience.retries += 1
+            await asyncio.sleep(delay)
+            continue
+        finally:
+            if not settled:
+                # Closed or cancelled mid-stream (the client went away): the
+                # call proves nothing, and must not hold a half-open trial
+                breaker.cancelled(trial)
+
+
+def stats():
+    return {
+        "max_concurrency": AI_MAX_CONCURRENCY,
+        "in_flight": admission.active,
+        "waiting": admission.stats()["waiting"],
+        "admission": admission.stats(),
+        "coalescing": _coalescer.stats(),
+        "resilience": gemini_resilience.stats(),
+    }
@@ -1,9 +1,14 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from cache import LRUCache
 
 load_dotenv()
 
@@ -11,7 +16,17 @@ SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pick the cost for this host with calibrate_bcrypt.py
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL while hashing, so a thread pool spreads logins over
+# all cores without blocking the event loop. Jobs beyond the pool size wait
+# in a bounded queue; past that the request is shed with 503.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", os.cpu_count() or 2))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", 64))
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_password_jobs = 0
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -19,6 +34,30 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def _run_password_job(func, *args):
+    global _password_jobs
+    if _password_jobs >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again",
+            headers={"Retry-After": "1"},
+        )
+    _password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_pool, func, *args)
+    finally:
+        _password_jobs -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_password_job(get_password_hash, password)
+
+def password_pool_stats():
+    return {"workers": PASSWORD_WORKERS, "queue_limit": PASSWORD_QUEUE_LIMIT, "jobs": _password_jobs}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,18 +73,41 @@ from fastapi.security import OAuth2PasswordBearer
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/teacher/login")
 
+# Verified tokens, keyed by a digest of the token. Each entry lives only until
+# the token's own exp, so a cached token can never outlive its validity.
+_token_cache = LRUCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 4096)))
+
+def token_cache_stats():
+    return _token_cache.info()
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        user, exp = cached
+        if exp > time.time():
+            return dict(user)
+        _token_cache.delete(digest)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         role: str = payload.get("role")
         if email is None:
             raise credentials_exception
-        return {"email": email, "role": role}
+        user = {"email": email, "role": role}
+        exp = payload.get("exp")
+        if exp is not None:
+            _token_cache.set(digest, (user, exp), ttl=exp - time.time())
+        return dict(user)
     except JWTError:
         raise credentials_exception
+
+async def get_current_admin(user: dict = Depends(get_current_user)):
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
@@ -0,0 +1,114 @@
+"""
+Load test: Gemini calls offered faster than they can be served, with and
+without admission control.
+
+    python bench_admission.py --rate 60 --seconds 5 --service 0.2
+
+A fake client takes --service seconds per call and ai_executor allows
+AI_MAX_CONCURRENCY (default 8) at once, so capacity is about 40 calls/s.
+Requests arrive open-loop at --rate per second, --background of them
+being feedback analysis. Without admission control the queue grows for as
+long as the overload lasts and so does every caller's latency. With it,
+latency stays bounded by the queue limit and the excess is refused at once
+with 503 + Retry-After, background work first.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from fastapi import HTTPException
+
+import ai_executor
+from admission import AdmissionController, BACKGROUND, INTERACTIVE
+
+
+class FakeModels:
+    def __init__(self, service):
+        self.service = service
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.service)
+        return "ok"
+
+
+class FakeClient:
+    def __init__(self, service):
+        self.models = FakeModels(service)
+
+
+def pct(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] * 1000
+
+
+async def offer(args, controller, timeouts, prioritize=True):
+    ai_executor.admission = controller
+    ai_executor.AI_QUEUE_TIMEOUT, ai_executor.AI_BACKGROUND_QUEUE_TIMEOUT = timeouts
+    client = FakeClient(args.service)
+    results = {INTERACTIVE: [], BACKGROUND: []}  # (ok, latency)
+    rng = random.Random(1)
+
+    async def one(i, priority):
+        start = time.perf_counter()
+        try:
+            # Without priorities everyone shares one FIFO, like the old semaphore
+            await ai_executor.generate_content(
+                client, f"question {i}", priority=priority if prioritize else INTERACTIVE
+            )
+            results[priority].append((True, time.perf_counter() - start))
+        except HTTPException:
+            results[priority].append((False, time.perf_counter() - start))
+
+    tasks = []
+    deadline = time.perf_counter() + args.seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        priority = BACKGROUND if rng.random() < args.background else INTERACTIVE
+        tasks.append(asyncio.create_task(one(i, priority)))
+        i += 1
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def report(name, results):
+    print(name)
+    for priority, label in ((INTERACTIVE, "chat"), (BACKGROUND, "analysis")):
+        ok = [t for success, t in results[priority] if success]
+        refused = [t for success, t in results[priority] if not success]
+        print(
+            f"  {label:>9}: {len(ok):4d} served  p50={pct(ok, 50):7.0f} ms  p99={pct(ok, 99):7.0f} ms"
+            f"  | {len(refused):4d} refused  median={statistics.median(refused) * 1000 if refused else 0:6.0f} ms"
+        )
+
+
+async def run(args):
+    unbounded = AdmissionController(ai_executor.AI_MAX_CONCURRENCY, queue_limit=10 ** 9)
+    report("no admission control (unbounded FIFO)", await offer(args, unbounded, (None, None), prioritize=False))
+    bounded = AdmissionController(ai_executor.AI_MAX_CONCURRENCY, queue_limit=args.queue)
+    report(
+        f"admission control (queue {args.queue}, wait {args.timeout:g}s)",
+        await offer(args, bounded, (args.timeout, args.timeout * 2))
+    )
+    print("stats:", bounded.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=60)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--service", type=float, default=0.2)
+    parser.add_argument("--background", type=float, default=0.3)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+    ai_executor.AI_COALESCE = False
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Microbenchmark: per-request overhead of obtaining AI provider clients.
+
+"before" builds a genai.Client and an HTTP client on every request, as
+analyze_feedback used to. "after" resolves the shared AIClients registry
+through the FastAPI dependency. Only client setup is measured; no request
+leaves the machine, so connection reuse is not shown here (and Gemini
+calls get none: google-genai 0.3.0 opens a new session per call).
+
+    python bench_ai_client.py --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from google import genai
+
+from ai_clients import AIClients, get_ai_clients
+
+
+class FakeRequest:
+    class app:
+        class state:
+            ai_clients = None
+
+
+async def per_request(iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        genai.Client(api_key="bench-key")
+        http = httpx.AsyncClient()
+        await http.aclose()
+    return time.perf_counter() - start
+
+
+async def shared(iterations):
+    clients = AIClients()
+    clients.gemini = genai.Client(api_key="bench-key")
+    clients.http = httpx.AsyncClient()
+    FakeRequest.app.state.ai_clients = clients
+    start = time.perf_counter()
+    for _ in range(iterations):
+        get_ai_clients(FakeRequest)
+    elapsed = time.perf_counter() - start
+    await clients.close()
+    return elapsed
+
+
+async def run(args):
+    for label, bench in (("before (per request)", per_request), ("after (shared)", shared)):
+        elapsed = await bench(args.iterations)
+        print(f"{label:>22}: {elapsed / args.iterations * 1e6:10.2f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
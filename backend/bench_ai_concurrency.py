@@ -0,0 +1,92 @@
+"""
+Benchmark: latency of non-AI requests while N chat calls are in flight.
+
+Gemini is replaced by a fake client that blocks its thread for AI_DELAY
+seconds, which is what the real SDK does during a round trip. Run with
+--blocking to reproduce the old behaviour (SDK called on the event loop).
+
+    python bench_ai_concurrency.py --chats 16 --probes 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import ai_executor
+from routers import ai
+from ai_clients import AIClients, get_ai_clients
+from main import app
+
+
+class FakeResponse:
+    text = "💡 Friction is the grip that stops things sliding."
+
+
+class FakeModels:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.delay)
+        return FakeResponse()
+
+
+class FakeClient:
+    def __init__(self, delay):
+        self.models = FakeModels(delay)
+
+
+async def blocking_generate_content(client, contents, config=None, model=ai_executor.GEMINI_MODEL):
+    return client.models.generate_content(model=model, contents=contents, config=config)
+
+
+async def probe(http, count, interval=0.01):
+    # Latency is measured from when each probe was due, not when it was
+    # sent, so time spent waiting for a blocked event loop is counted.
+    latencies = []
+    due = time.perf_counter()
+    for _ in range(count):
+        await asyncio.sleep(max(0, due - time.perf_counter()))
+        await http.get("/")
+        latencies.append((time.perf_counter() - due) * 1000)
+        due += interval
+    return latencies
+
+
+async def run(args):
+    clients = AIClients()
+    clients.gemini = FakeClient(args.delay)
+    app.dependency_overrides[get_ai_clients] = lambda: clients
+    if args.blocking:
+        ai.generate_content = blocking_generate_content
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        baseline = await probe(http, args.probes)
+
+        # Probes start first so they overlap the chats even when a blocking
+        # SDK call holds the loop as soon as a chat task is scheduled.
+        probes = asyncio.create_task(probe(http, args.probes))
+        await asyncio.sleep(0.02)
+        chats = [
+            asyncio.create_task(http.post("/api/ai/chat", data={"message": f"Explain friction {i}"}))
+            for i in range(args.chats)
+        ]
+        loaded = await probes
+        await asyncio.gather(*chats)
+
+    for label, values in (("idle", baseline), (f"{args.chats} chats in flight", loaded)):
+        values.sort()
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        print(f"{label:>24}: p50={statistics.median(values):8.2f} ms  p99={p99:8.2f} ms  max={values[-1]:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=16)
+    parser.add_argument("--probes", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=2.0, help="simulated Gemini latency (s)")
+    parser.add_argument("--blocking", action="store_true", help="call the SDK on the event loop")
+    asyncio.run(run(parser.parse_args()))
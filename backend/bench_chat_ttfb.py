@@ -0,0 +1,89 @@
+"""
+Benchmark: time-to-first-byte of /api/ai/chat, JSON vs SSE streaming.
+
+Gemini is replaced by a fake client that emits --chunks pieces of text,
+sleeping --chunk-delay seconds before each one. The app is served by a real
+uvicorn instance on a local port because httpx's ASGI transport buffers the
+whole body and would hide the streaming gain.
+
+    python bench_chat_ttfb.py --runs 5
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from ai_clients import AIClients, get_ai_clients
+from main import app
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+
+    def generate_content_stream(self, model, contents, config=None):
+        for i in range(self.chunks):
+            time.sleep(self.delay)
+            yield FakeChunk(f"token{i} ")
+
+    def generate_content(self, model, contents, config=None):
+        return FakeChunk("".join(c.text for c in self.generate_content_stream(model, contents, config)))
+
+
+class FakeClient:
+    def __init__(self, chunks, delay):
+        self.models = FakeModels(chunks, delay)
+
+
+async def measure(http, stream):
+    # A unique question per run keeps the answer cache out of the measurement.
+    data = {"message": f"Explain friction {time.time_ns()}", "stream": "true" if stream else "false"}
+    start = time.perf_counter()
+    async with http.stream("POST", "/api/ai/chat", data=data) as response:
+        first = None
+        async for _ in response.aiter_bytes():
+            if first is None:
+                first = time.perf_counter() - start
+        total = time.perf_counter() - start
+    return first * 1000, total * 1000
+
+
+def serve(port):
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run(args):
+    clients = AIClients()
+    clients.gemini = FakeClient(args.chunks, args.chunk_delay)
+    app.dependency_overrides[get_ai_clients] = lambda: clients
+    server = serve(args.port)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None) as http:
+        for stream in (False, True):
+            results = [await measure(http, stream) for _ in range(args.runs)]
+            ttfb = sum(r[0] for r in results) / len(results)
+            total = sum(r[1] for r in results) / len(results)
+            label = "sse" if stream else "json"
+            print(f"{label:>5}: ttfb={ttfb:8.1f} ms  total={total:8.1f} ms")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-delay", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(run(parser.parse_args()))
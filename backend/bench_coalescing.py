@@ -0,0 +1,77 @@
+"""
+Benchmark: upstream Gemini calls for a burst of identical requests, with and
+without request coalescing, plus a check that cancelling the leader does not
+cancel the callers sharing its call.
+
+    python bench_coalescing.py --callers 30 --delay 0.5
+
+Uses a fake client whose generate_content sleeps for --delay seconds.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import ai_executor
+
+
+class FakeModels:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents, config=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return f"answer to {contents!r}"
+
+
+class FakeClient:
+    def __init__(self, delay):
+        self.models = FakeModels(delay)
+
+
+async def burst(callers, delay, coalesce):
+    ai_executor.AI_COALESCE = coalesce
+    client = FakeClient(delay)
+    start = time.perf_counter()
+    # Whitespace differences still map to the same request
+    prompts = ["Explain  friction to grade 6" if i % 2 else "Explain friction to grade 6" for i in range(callers)]
+    await asyncio.gather(*[ai_executor.generate_content(client, p) for p in prompts])
+    return client.models.calls, time.perf_counter() - start
+
+
+async def leader_cancellation(delay):
+    ai_executor.AI_COALESCE = True
+    client = FakeClient(delay)
+    leader = asyncio.create_task(ai_executor.generate_content(client, "What is photosynthesis?"))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.create_task(ai_executor.generate_content(client, "What is photosynthesis?")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    leader.cancel()  # the leader's HTTP client disconnects
+    results = await asyncio.gather(*followers, return_exceptions=True)
+    ok = all(isinstance(r, str) for r in results)
+    return ok, client.models.calls
+
+
+async def run(args):
+    for coalesce in (False, True):
+        calls, elapsed = await burst(args.callers, args.delay, coalesce)
+        label = "coalesced" if coalesce else "independent"
+        print(f"{label:>12}: {args.callers} callers -> {calls:3d} upstream calls in {elapsed:5.2f} s")
+    ok, calls = await leader_cancellation(args.delay)
+    print(f"leader cancelled: followers {'all answered' if ok else 'FAILED'} ({calls} upstream call)")
+    print("stats:", ai_executor.stats()["coalescing"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
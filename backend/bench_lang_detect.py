@@ -0,0 +1,55 @@
+"""
+Benchmark: microseconds per message for lang_detect vs langdetect, plus
+how often each one agrees with the expected language on short messages.
+
+    python bench_lang_detect.py --rounds 200
+"""
+import argparse
+import time
+
+from langdetect import DetectorFactory, LangDetectException, detect
+
+from lang_detect import detect_language
+
+DetectorFactory.seed = 0
+
+SAMPLES = [
+    ("en", "Explain friction"),
+    ("en", "How do I teach fractions to grade 3?"),
+    ("kn", "ಘರ್ಷಣೆ ಎಂದರೇನು"),
+    ("kn", "ಮಕ್ಕಳಿಗೆ ಭಿನ್ನರಾಶಿ ಹೇಗೆ ಕಲಿಸುವುದು"),
+    ("hi", "घर्षण क्या है"),
+    ("hi", "बच्चों को प्रकाश संश्लेषण कैसे समझाओ"),
+    ("mr", "घर्षण म्हणजे काय आहे"),
+    ("ta", "உராய்வு என்றால் என்ன"),
+    ("te", "ఘర్షణ అంటే ఏమిటి"),
+    ("ml", "ഘർഷണം എന്താണ്"),
+    ("bn", "ঘর্ষণ কী"),
+    ("gu", "ઘર્ષણ શું છે"),
+]
+
+
+def langdetect_code(text):
+    try:
+        return detect(text)
+    except LangDetectException:
+        return None
+
+
+def measure(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, text in SAMPLES:
+            func(text)
+    elapsed = time.perf_counter() - start
+    accuracy = sum(func(text) == expected for expected, text in SAMPLES) / len(SAMPLES)
+    return elapsed / (rounds * len(SAMPLES)) * 1e6, accuracy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    for label, func in (("lang_detect", detect_language), ("langdetect", langdetect_code)):
+        us, accuracy = measure(func, args.rounds)
+        print(f"{label:>12}: {us:9.2f} us/message  accuracy={accuracy:.0%}")
@@ -0,0 +1,72 @@
+"""
+Load benchmark: teacher logins per second on one worker.
+
+The teachers collection is replaced by an in-memory stand-in so only
+password verification and token creation are measured. --blocking
+reproduces the old behaviour (bcrypt on the event loop).
+
+    python bench_login.py --concurrency 32 --seconds 10
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import auth
+from main import app
+from routers import teacher
+
+EMAIL = "bench_teacher@school.com"
+PASSWORD = "bench-password"
+
+
+class FakeTeachers:
+    def __init__(self):
+        self.doc = {
+            "email": EMAIL,
+            "name": "Bench Teacher",
+            "school": "Bench School",
+            "password_hash": auth.get_password_hash(PASSWORD),
+            "preferred_language": "en",
+        }
+
+    async def find_one(self, query, *args, **kwargs):
+        return self.doc if query.get("email") == EMAIL else None
+
+
+async def blocking_verify(plain_password, hashed_password):
+    return auth.verify_password(plain_password, hashed_password)
+
+
+async def worker(http, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await http.post("/api/teacher/login", json={"email": EMAIL, "password": PASSWORD})
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(args):
+    teacher.teacher_collection = FakeTeachers()
+    if args.blocking:
+        teacher.verify_password_async = blocking_verify
+
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(*[worker(http, deadline, latencies) for _ in range(args.concurrency)])
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"rounds={auth.BCRYPT_ROUNDS} workers={auth.PASSWORD_WORKERS} blocking={args.blocking}")
+    print(f"{len(latencies) / args.seconds:8.1f} logins/s  p99={p99 * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--blocking", action="store_true")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""
+Benchmark: chapter-progress updates per second against MongoDB
+(MONGODB_URI, e.g. a local mongod). Uses a scratch collection that is
+dropped afterwards.
+
+  set       - the old endpoint: $set of the whole completed_chapters array
+  addToSet  - one $addToSet/$pull per checkbox tick
+  bulk      - --batch ticks across subjects, merged per subject as the
+              bulk endpoint does, in one unordered bulk_write
+
+    python bench_progress.py --subjects 50 --ticks 2000 --batch 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from pymongo import UpdateOne
+
+from database import DB
+
+CHAPTERS = 20
+
+
+async def run(args):
+    collection = DB.bench_subjects_progress
+    await collection.drop()
+    await collection.insert_many([
+        {"id": f"sub-{i}", "teacher_email": "bench@school.com", "completed_chapters": []}
+        for i in range(args.subjects)
+    ])
+    await collection.create_index([("teacher_email", 1), ("id", 1)])
+    rng = random.Random(0)
+    ticks = [(f"sub-{rng.randrange(args.subjects)}", rng.randrange(CHAPTERS), rng.random() < 0.7) for _ in range(args.ticks)]
+    state = {f"sub-{i}": set() for i in range(args.subjects)}
+
+    async def full_set():
+        for sub_id, chapter, done in ticks:
+            chapters = state[sub_id]
+            chapters.add(chapter) if done else chapters.discard(chapter)
+            await collection.update_one(
+                {"id": sub_id, "teacher_email": "bench@school.com"},
+                {"$set": {"completed_chapters": sorted(chapters)}}
+            )
+
+    async def incremental():
+        for sub_id, chapter, done in ticks:
+            op = {"$addToSet": {"completed_chapters": chapter}} if done else {"$pull": {"completed_chapters": chapter}}
+            await collection.update_one({"id": sub_id, "teacher_email": "bench@school.com"}, op)
+
+    async def bulk():
+        # As the bulk endpoint does: merge each subject's ticks (last one
+        # wins), then one $addToSet and one $pull per subject, unordered
+        for start in range(0, len(ticks), args.batch):
+            wanted = {}
+            for sub_id, chapter, done in ticks[start:start + args.batch]:
+                wanted.setdefault(sub_id, {})[chapter] = done
+            ops = []
+            for sub_id, chapters in wanted.items():
+                query = {"id": sub_id, "teacher_email": "bench@school.com"}
+                add = [c for c, done in chapters.items() if done]
+                remove = [c for c, done in chapters.items() if not done]
+                if add:
+                    ops.append(UpdateOne(query, {"$addToSet": {"completed_chapters": {"$each": add}}}))
+                if remove:
+                    ops.append(UpdateOne(query, {"$pull": {"completed_chapters": {"$in": remove}}}))
+            await collection.bulk_write(ops, ordered=False)
+
+    for label, bench in (("set", full_set), ("addToSet", incremental), (f"bulk x{args.batch}", bulk)):
+        start = time.perf_counter()
+        await bench()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>10}: {args.ticks / elapsed:10.1f} updates/s")
+
+    await collection.drop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subjects", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
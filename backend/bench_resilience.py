@@ -0,0 +1,145 @@
+"""
+Fault-injection test of the resilience layer. Starts hf_standin on a local
+port and drives the real Gemini SDK client and the translation helpers at it
+while the stand-in fails or stalls a share of requests.
+
+    python bench_resilience.py --calls 200
+
+Scenarios:
+  errors   30% of requests answered 503: success rate without / with retry
+  tail     3% of requests stall 2 s: translation p99 without / with hedging
+  outage   every request fails: the breaker opens and calls fail fast,
+           then the stand-in recovers and a trial call closes it again
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import uvicorn
+
+os.environ.setdefault("STANDIN_LATENCY", "0.05")
+import hf_standin  # noqa: E402  (reads STANDIN_LATENCY at import)
+import ai_executor  # noqa: E402
+import translation  # noqa: E402
+from google import genai  # noqa: E402
+from resilience import Resilience  # noqa: E402
+
+PORT = 8123
+BASE = f"http://127.0.0.1:{PORT}"
+
+
+def serve():
+    server = uvicorn.Server(uvicorn.Config(hf_standin.app, port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def faults(**values):
+    hf_standin.app.state.faults.update({"error_rate": 0.0, "slow_rate": 0.0, "slow_latency": 2.0, **values})
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000
+
+
+def hf_policy(**overrides):
+    settings = dict(attempts=3, base_delay=0.05, hedge=False, breaker_threshold=10 ** 6)
+    settings.update(overrides)
+    return Resilience("huggingface", translation.hf_retryable, **settings)
+
+
+async def translate_calls(http, calls, concurrency=10):
+    latencies, ok = [], 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal ok
+        async with slots:
+            start = time.perf_counter()
+            result = await translation.translate_one(http, f"sentence {i}", "m", "eng_Latn", "hin_Deva")
+            latencies.append(time.perf_counter() - start)
+            ok += result is not None
+
+    await asyncio.gather(*[one(i) for i in range(calls)])
+    return ok, latencies
+
+
+async def gemini_calls(client, calls):
+    ok = 0
+
+    async def one(i):
+        nonlocal ok
+        try:
+            await ai_executor.generate_content(client, f"question {i}")
+            ok += 1
+        except Exception:
+            pass
+
+    await asyncio.gather(*[one(i) for i in range(calls)])
+    return ok
+
+
+async def run(args):
+    translation.HF_API_BASE = f"{BASE}/models"
+    ai_executor.AI_COALESCE = False
+    gemini = genai.Client(api_key="standin", http_options={"base_url": BASE})
+    async with httpx.AsyncClient() as http:
+        print("errors: 30% of requests fail with 503")
+        faults(error_rate=0.3)
+        for label, attempts in (("no retry", 1), ("retry x3", 3)):
+            translation.hf_resilience = hf_policy(attempts=attempts)
+            ok, _ = await translate_calls(http, args.calls)
+            ai_executor.gemini_resilience = Resilience(
+                "gemini", ai_executor.gemini_retryable, attempts=attempts, base_delay=0.05, breaker_threshold=10 ** 6
+            )
+            # kept within the admission queue so refusals do not count as faults
+            gemini_total = min(args.calls, ai_executor.AI_MAX_CONCURRENCY + ai_executor.AI_QUEUE_LIMIT)
+            gemini_ok = await gemini_calls(gemini, gemini_total)
+            print(f"  {label:>9}: translate {ok}/{args.calls} ok   gemini {gemini_ok}/{gemini_total} ok")
+
+        print("tail: 3% of requests stall for 2 s")
+        faults(slow_rate=0.03)
+        for label, hedge in (("no hedge", False), ("hedged", True)):
+            translation.hf_resilience = hf_policy(hedge=hedge)
+            await translate_calls(http, 100)  # fill the latency window the p95 comes from
+            ok, latencies = await translate_calls(http, args.calls)
+            stats = translation.hf_resilience.stats()
+            print(
+                f"  {label:>9}: p50={pct(latencies, 50):6.0f} ms  p99={pct(latencies, 99):6.0f} ms"
+                f"  hedges={stats['hedges']} won={stats['hedge_wins']}"
+            )
+
+        print("outage: every request fails")
+        faults(error_rate=1.0)
+        translation.hf_resilience = hf_policy(attempts=2, breaker_threshold=5, breaker_reset=1.0)
+        before = hf_standin.app.state.requests
+        ok, latencies = await translate_calls(http, args.calls, concurrency=1)
+        print(
+            f"  {args.calls} calls -> {hf_standin.app.state.requests - before} upstream requests,"
+            f" circuit {translation.hf_resilience.breaker.state}, median {pct(latencies, 50):.1f} ms per call"
+        )
+        faults()
+        await asyncio.sleep(1.1)
+        ok, _ = await translate_calls(http, 5, concurrency=1)
+        print(f"  recovered: {ok}/5 ok, circuit {translation.hf_resilience.breaker.state}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    server = serve()
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
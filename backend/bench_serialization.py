@@ -0,0 +1,101 @@
+"""
+Benchmark: time to turn a list of feedback documents into a JSON response
+body, before and after the fast path in fast_json.py.
+
+    python bench_serialization.py --items 1000 --rounds 50
+
+  stdlib      response_model validation, jsonable dump, json.dumps (older FastAPI)
+  dump_json   response_model validation and pydantic's JSON encoder (newer FastAPI)
+  trusted     model defaults merged in, orjson.dumps, no validation (fast_json)
+
+All three go through the real list endpoint once as a sanity check that
+the bodies agree.
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from fast_json import trusted_list
+from routers.feedback import FeedbackItem
+
+
+def make_items(count):
+    return [
+        {
+            "id": f"{i:032x}",
+            "date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "preview": "Students struggled with fractions when...",
+            "type": "Observation",
+            "full_text": "Students struggled with fractions when the denominators were different. " * 3,
+            "language": "en",
+            "analysis": {
+                "good_things": "Used concrete objects to show halves and quarters.",
+                "bad_things": "Moved to symbols before the class was ready.",
+                "improvement": "Spend one more lesson on paper-folding activities.",
+            },
+            "effectiveness": None if i % 3 else "yes",
+            "teacher_email": "demo_teacher@school.com",
+        }
+        for i in range(count)
+    ]
+
+
+ADAPTER = TypeAdapter(List[FeedbackItem])
+
+
+def stdlib(items):
+    validated = ADAPTER.validate_python(items)
+    return json.dumps(ADAPTER.dump_python(validated, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def dump_json(items):
+    return ADAPTER.dump_json(ADAPTER.validate_python(items))
+
+
+def trusted(items):
+    return trusted_list(FeedbackItem, items).body
+
+
+def measure(func, items, rounds):
+    func(items)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(items)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def check_endpoint(items):
+    app = FastAPI()
+
+    @app.get("/list")
+    async def listing(response: Response):
+        return trusted_list(FeedbackItem, items, response)
+
+    body = TestClient(app).get("/list").json()
+    expected = ADAPTER.dump_python(ADAPTER.validate_python(items), mode="json")
+    assert body == expected, "fast path body differs from the validated one"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    check_endpoint(items)
+    print(f"{args.items} feedback items, {args.rounds} rounds")
+    baseline = None
+    for name, func in [("stdlib", stdlib), ("dump_json", dump_json), ("trusted", trusted)]:
+        ms = measure(func, items, args.rounds)
+        baseline = baseline or ms
+        print(f"{name:>10}: {ms:8.2f} ms per list  ({baseline / ms:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: translate_json on a 5-field reflection against the local HF
+stand-in (hf_standin.py), comparing the old serial loop, the batched
+pipeline and a repeat served from translation memory.
+
+    python bench_translation.py --latency 0.3
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import httpx
+import uvicorn
+
+import hf_standin
+import translation
+from routers import ai
+
+REFLECTION = {
+    "acknowledgement": "Great job keeping the class engaged today.",
+    "deep_dive": "Split the class into small groups for the fractions activity.",
+    "quick_fix": "Use the board to list the three key steps.",
+    "tomorrow_prep": "Prepare paper strips for folding into halves and quarters.",
+    "pro_tip": "Ask a student to explain the idea back to the class.",
+}
+
+
+def serve(port):
+    server = uvicorn.Server(uvicorn.Config(hf_standin.app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def serial(http, data, lang):
+    # The pre-pipeline behaviour: one round trip per field, one after another
+    tgt = ai.LANG_MAP[lang]
+    out = {}
+    for key, value in data.items():
+        out[key] = await translation.translate_one(http, value, translation.TRANSLATION_MODEL, "eng_Latn", tgt)
+    return out
+
+
+async def timed(label, coro):
+    before = hf_standin.app.state.requests
+    start = time.perf_counter()
+    await coro
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:>20}: {elapsed:8.1f} ms  upstream requests={hf_standin.app.state.requests - before}")
+
+
+async def run(args):
+    hf_standin.STANDIN_LATENCY = args.latency
+    server = serve(args.port)
+    translation.HF_API_BASE = f"http://127.0.0.1:{args.port}/models"
+    translation.translation_memory = translation.TranslationMemory(None)
+
+    async with httpx.AsyncClient() as http:
+        await timed("serial", serial(http, REFLECTION, "kn"))
+        await timed("batched", ai.translate_json(http, REFLECTION, "kn"))
+        await timed("translation memory", ai.translate_json(http, REFLECTION, "kn"))
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8100)
+    asyncio.run(run(parser.parse_args()))
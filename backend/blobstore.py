@@ -0,0 +1,93 @@
+import asyncio
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from database import DB
+
+load_dotenv()
+
+# "gridfs" keeps blobs in the database next to everything else; "disk" writes
+# them under BLOB_DIR, which suits a single-host deployment.
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "gridfs")
+BLOB_DIR = os.getenv("BLOB_DIR", "blobs")
+
+
+class GridFSBlobStore:
+    def __init__(self, db, bucket_name="blobs"):
+        self.db = db
+        self.bucket_name = bucket_name
+        self.files = db[f"{bucket_name}.files"]
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        # Created on first use: building a bucket binds Motor to the current
+        # event loop, which at import time is not the one serving requests.
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=self.bucket_name)
+        return self._bucket
+
+    async def exists(self, name):
+        return await self.files.find_one({"filename": name}, {"_id": 1}) is not None
+
+    async def put(self, name, data, content_type):
+        # Names are content hashes, so an existing blob is already correct
+        if await self.exists(name):
+            return
+        await self.bucket.upload_from_stream(name, data, metadata={"content_type": content_type})
+
+    async def get(self, name):
+        doc = await self.files.find_one({"filename": name})
+        if doc is None:
+            return None
+        stream = await self.bucket.open_download_stream(doc["_id"])
+        data = await stream.read()
+        return data, (doc.get("metadata") or {}).get("content_type", "application/octet-stream")
+
+
+class DiskBlobStore:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, name):
+        return self.root / name[:2] / name
+
+    async def exists(self, name):
+        return await asyncio.to_thread(self._path(name).exists)
+
+    async def put(self, name, data, content_type):
+        path = self._path(name)
+
+        def write():
+            if path.exists():
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.with_suffix(".type").write_text(content_type)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+
+        await asyncio.to_thread(write)
+
+    async def get(self, name):
+        path = self._path(name)
+
+        def read():
+            if not path.exists():
+                return None
+            type_file = path.with_suffix(".type")
+            content_type = type_file.read_text() if type_file.exists() else "application/octet-stream"
+            return path.read_bytes(), content_type
+
+        return await asyncio.to_thread(read)
+
+
+def build_blob_store(backend=None):
+    backend = (backend or BLOB_BACKEND).lower()
+    if backend == "disk":
+        return DiskBlobStore(BLOB_DIR)
+    return GridFSBlobStore(DB)
+
+
+blob_store = build_blob_store()
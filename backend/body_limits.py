@@ -0,0 +1,61 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from image_pipeline import AI_IMAGE_MAX_BYTES, PROFILE_PICTURE_MAX_BYTES
+from ics import ICS_MAX_BYTES
+
+# Upload routes cap the request body before Starlette spools the multipart
+# form to disk: a declared Content-Length over the cap is refused before any
+# of the body is read, and a body without one is counted as it arrives.
+# read_upload() still applies the exact per-file limit afterwards.
+FORM_OVERHEAD = 64 * 1024  # multipart boundaries, headers and text fields
+
+# Path prefix -> largest accepted request body in bytes
+BODY_LIMITS = [
+    ("/api/ai/chat", AI_IMAGE_MAX_BYTES + FORM_OVERHEAD),
+    ("/api/teacher/profile/picture", PROFILE_PICTURE_MAX_BYTES + FORM_OVERHEAD),
+    ("/api/calendar/import", ICS_MAX_BYTES + FORM_OVERHEAD),
+]
+
+
+class BodyTooLarge(HTTPException):
+    def __init__(self, limit):
+        super().__init__(status_code=413, detail=f"Upload too large (limit {limit // (1024 * 1024)} MB)")
+
+
+def body_limit(path):
+    for prefix, limit in BODY_LIMITS:
+        if path.startswith(prefix):
+            return limit
+    return None
+
+
+class BodyLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = body_limit(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name.lower() == b"content-length" and value.isdigit() and int(value) > limit:
+                error = BodyTooLarge(limit)
+                response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing, which FastAPI passes on as the 413
+                    raise BodyTooLarge(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class LRUCache:
+    """Thread-safe LRU map where every entry carries its own expiry time."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.stats.hits += 1
+                    return value
+                del self._data[key]
+            self.stats.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def info(self):
+        return {**self.stats.as_dict(), "size": len(self._data), "maxsize": self.maxsize}
+
+
+class MemoryBackend:
+    """In-process backend: fastest, but private to one worker."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.store = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.store.set(key, value, ttl)
+
+    async def delete(self, key):
+        self.store.delete(key)
+
+    def info(self):
+        return {"backend": "memory", **self.store.info()}
+
+
+class MongoBackend:
+    """
+    Shared backend on a Mongo collection, so every worker sees the same
+    entries. Expired documents are ignored on read and removed by a TTL
+    index on expires_at.
+    """
+
+    def __init__(self, collection, ttl=300):
+        self.collection = collection
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._indexed = False
+
+    async def get(self, key):
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        if doc is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return doc["value"]
+
+    async def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if not self._indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)}},
+            upsert=True
+        )
+
+    async def delete(self, key):
+        await self.collection.delete_one({"_id": key})
+
+    def info(self):
+        return {"backend": "mongo", "collection": self.collection.name, **self.stats.as_dict()}
+
+
+def build_cache(name, backend=None, maxsize=1024, ttl=300):
+    """Create a cache backend; "mongo" stores entries in the cache_<name> collection."""
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend == "mongo":
+        from database import DB
+        return MongoBackend(DB[f"cache_{name}"], ttl=ttl)
+    return MemoryBackend(maxsize=maxsize, ttl=ttl)
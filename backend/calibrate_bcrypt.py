@@ -0,0 +1,37 @@
+"""
+Pick the bcrypt cost for this host: the highest number of rounds whose
+hash time stays within the target latency.
+
+    python calibrate_bcrypt.py --target-ms 250
+    # then set BCRYPT_ROUNDS=<printed value> in .env
+"""
+import argparse
+import time
+
+from passlib.hash import bcrypt
+
+
+def hash_time(rounds, samples):
+    hasher = bcrypt.using(rounds=rounds)
+    start = time.perf_counter()
+    for _ in range(samples):
+        hasher.hash("calibration-password")
+    return (time.perf_counter() - start) / samples * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    chosen = args.min_rounds
+    for rounds in range(args.min_rounds, 17):
+        ms = hash_time(rounds, args.samples)
+        print(f"rounds={rounds:2d}: {ms:8.1f} ms")
+        if ms > args.target_ms:
+            break
+        chosen = rounds
+
+    print(f"\nBCRYPT_ROUNDS={chosen}")
@@ -15,6 +15,8 @@ tasks_collection = DB.tasks
 subjects_collection = DB.subjects
 reminders_collection = DB.reminders
 feedback_collection = DB.feedback
+translation_memory_collection = DB.translation_memory
+jobs_collection = DB.jobs
 
 async def get_database():
     return DB
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+import pymongo
+from pymongo.errors import PyMongoError
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+load_dotenv()
+
+# Every request carries a deadline: the client's X-Request-Timeout (seconds)
+# or the route's default, whichever is shorter. Downstream calls take their
+# timeouts from what is left of it, so a request that has run out of budget
+# stops instead of carrying on after its client has given up:
+#   - Mongo: pymongo.timeout() makes the driver send maxTimeMS on every
+#     operation (Motor copies the context into its worker threads)
+#   - Gemini and Hugging Face: ai_executor and translation cap their waits
+#     with budget() / within()
+REQUEST_TIMEOUT_HEADER = "x-request-timeout"
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("DEFAULT_REQUEST_TIMEOUT", 30))
+
+# Path prefix -> default budget in seconds; None means no deadline
+ROUTE_TIMEOUTS = [
+    ("/api/ai/chat", float(os.getenv("CHAT_REQUEST_TIMEOUT", 90))),
+    ("/api/calendar/import", 300.0),
+    ("/api/calendar/export.ics", 300.0),
+]
+# Long-lived event streams end when the client leaves, not on a budget
+UNBOUNDED_SUFFIXES = ("/stream",)
+
+_deadline = ContextVar("request_deadline", default=None)  # time.monotonic() value
+# The context as it was before the outermost scope() (no deadline of ours and
+# no pymongo.timeout(), which can only shorten a deadline, never lift one)
+_unbounded = ContextVar("unbounded_context", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Request deadline exceeded")
+
+
+def remaining():
+    """Seconds left in the current deadline, or None when there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired():
+    return remaining() == 0.0
+
+
+def check():
+    if expired():
+        raise DeadlineExceeded()
+
+
+def raise_if_timeout(error):
+    """
+    For handlers that catch Exception: re-raise a spent deadline, ours or
+    the driver's (maxTimeMS), as the 504 rather than report it as a 500.
+    """
+    if isinstance(error, DeadlineExceeded):
+        raise error
+    if isinstance(error, PyMongoError) and error.timeout:
+        raise DeadlineExceeded() from error
+
+
+def budget(timeout=None):
+    """`timeout` capped by the remaining deadline (either may be None)."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+async def within(awaitable, timeout=None):
+    """Await with the remaining budget; DeadlineExceeded once it is spent."""
+    check()
+    try:
+        return await asyncio.wait_for(awaitable, budget(timeout))
+    except asyncio.TimeoutError:
+        if expired():
+            raise DeadlineExceeded()
+        raise
+
+
+@contextmanager
+def scope(seconds):
+    """Run the enclosed code under a deadline `seconds` from now."""
+    outer = _unbounded.get() or copy_context()
+    token = _deadline.set(time.monotonic() + seconds)
+    outer_token = _unbounded.set(outer)
+    try:
+        with pymongo.timeout(seconds):
+            yield
+    finally:
+        _unbounded.reset(outer_token)
+        _deadline.reset(token)
+
+
+def detached():
+    """
+    A copy of the current context with no deadline, for work shared by
+    several requests (see SingleFlight): no one caller's budget may cut it
+    short, each caller bounds only its own wait.
+    """
+    outer = _unbounded.get()
+    return outer.copy() if outer is not None else copy_context()
+
+
+def route_timeout(path):
+    if path.endswith(UNBOUNDED_SUFFIXES):
+        return None
+    for prefix, seconds in ROUTE_TIMEOUTS:
+        if path.startswith(prefix):
+            return seconds
+    return DEFAULT_REQUEST_TIMEOUT
+
+
+def request_timeout(path, header_value):
+    seconds = route_timeout(path)
+    if seconds is None or not header_value:
+        return seconds
+    try:
+        requested = float(header_value)
+    except ValueError:
+        return seconds
+    # The header can shorten the budget, never extend it past the route's
+    return min(seconds, requested) if requested > 0 else seconds
+
+
+class DeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope_, receive, send):
+        if scope_["type"] != "http":
+            await self.app(scope_, receive, send)
+            return
+        header = None
+        for name, value in scope_["headers"]:
+            if name.decode("latin-1").lower() == REQUEST_TIMEOUT_HEADER:
+                header = value.decode("latin-1")
+        seconds = request_timeout(scope_["path"], header)
+        if seconds is None:
+            await self.app(scope_, receive, send)
+            return
+        with scope(seconds):
+            await self.app(scope_, receive, send)
@@ -0,0 +1,86 @@
+"""
+Local stand-in for the Hugging Face inference router and the Gemini API, for
+exercising the AI pipeline offline. Translations are fake: "[tgt_lang] <text>";
+Gemini answers echo the prompt.
+
+    uvicorn hf_standin:app --port 8100
+    HF_API_BASE=http://127.0.0.1:8100/models GEMINI_API_BASE=http://127.0.0.1:8100 uvicorn main:app
+
+Faults can be injected to exercise retries, hedging and the circuit breakers,
+from the environment at startup or at runtime:
+
+    curl -X PUT localhost:8100/faults -H 'Content-Type: application/json' \\
+         -d '{"error_rate": 0.3, "slow_rate": 0.05, "slow_latency": 3}'
+"""
+import asyncio
+import os
+import random
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.requests import ClientDisconnect
+
+app = FastAPI(title="HF Router Stand-in")
+
+STANDIN_LATENCY = float(os.getenv("STANDIN_LATENCY", 0.3))
+app.state.requests = 0
+app.state.faults = {
+    # share of requests answered with a 503
+    "error_rate": float(os.getenv("STANDIN_ERROR_RATE", 0)),
+    # share of requests that take slow_latency instead of STANDIN_LATENCY
+    "slow_rate": float(os.getenv("STANDIN_SLOW_RATE", 0)),
+    "slow_latency": float(os.getenv("STANDIN_SLOW_LATENCY", 3)),
+}
+
+
+async def read_json(request: Request):
+    # The losing half of a hedged pair hangs up mid-request
+    try:
+        return await request.json()
+    except ClientDisconnect:
+        return None
+
+
+async def inject_faults():
+    """Count the request, sleep its latency and return True if it should fail."""
+    app.state.requests += 1
+    faults = app.state.faults
+    slow = random.random() < faults["slow_rate"]
+    await asyncio.sleep(faults["slow_latency"] if slow else STANDIN_LATENCY)
+    return random.random() < faults["error_rate"]
+
+
+@app.put("/faults")
+async def set_faults(faults: dict):
+    app.state.faults.update({k: float(v) for k, v in faults.items() if k in app.state.faults})
+    return app.state.faults
+
+
+@app.post("/models/{model:path}")
+async def translate(model: str, request: Request):
+    body = await read_json(request)
+    if body is None:
+        return Response(status_code=499)
+    if await inject_faults():
+        return JSONResponse(status_code=503, content={"error": "Model is currently loading", "estimated_time": 5})
+    inputs = body.get("inputs")
+    tgt = body.get("parameters", {}).get("tgt_lang", "eng_Latn")
+    texts = inputs if isinstance(inputs, list) else [inputs]
+    return [{"translation_text": f"[{tgt}] {text}"} for text in texts]
+
+
+@app.post("/{version}/models/{model}:generateContent")
+async def generate_content(version: str, model: str, request: Request):
+    body = await read_json(request)
+    if body is None:
+        return Response(status_code=499)
+    if await inject_faults():
+        return JSONResponse(status_code=503, content={
+            "error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}
+        })
+    prompt = " ".join(
+        part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+    )
+    return {"candidates": [{
+        "content": {"role": "model", "parts": [{"text": f"Answer: {prompt[-80:]}"}]},
+        "finishReason": "STOP",
+    }]}
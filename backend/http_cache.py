@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import os
+from dotenv import load_dotenv
+from versions import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is used without it
+    brotli = None
+
+load_dotenv()
+
+# Bodies smaller than this go out as-is; compressing them costs more CPU than
+# the bytes are worth.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+COMPRESSIBLE = ("application/json", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding):
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class HTTPCacheMiddleware:
+    """
+    Conditional GETs and response compression for buffered responses.
+
+    - GET 200 responses without an ETag get a weak one hashed from the body,
+      and a matching If-None-Match turns them into a bodyless 304. Endpoints
+      using versions.conditional() answer 304 themselves, before serializing.
+    - Compressible bodies of at least COMPRESS_MIN_BYTES are brotli- or
+      gzip-encoded according to Accept-Encoding.
+
+    Responses without a Content-Length (SSE, ICS export and other streams)
+    pass through untouched so they are never buffered. So do HEAD responses:
+    their body is empty by definition, so it can give neither a validator
+    nor a length.
+    """
+
+    def __init__(self, app, min_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        is_get = scope["method"] == "GET"
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = {k.decode("latin-1").lower() for k, _ in message.get("headers", [])}
+                if "content-length" not in headers or "content-encoding" in headers:
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self.finish(start, b"".join(chunks), request_headers, is_get, send)
+
+        await self.app(scope, receive, wrapped_send)
+
+    async def finish(self, start, body, request_headers, is_get, send):
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        names = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in headers}
+        status = start["status"]
+
+        if is_get and status == 200:
+            etag = names.get("etag")
+            if etag is None:
+                etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+                headers.append((b"etag", etag.encode("latin-1")))
+            if etag_matches(etag, request_headers.get("if-none-match")):
+                kept = [(k, v) for k, v in headers if k.lower() not in (b"content-type", b"content-encoding")]
+                await send({"type": "http.response.start", "status": 304, "headers": kept})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        content_type = names.get("content-type", "")
+        if len(body) >= self.min_size and content_type.startswith(COMPRESSIBLE):
+            encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+            if encoding:
+                body = compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+            vary = names.get("vary")
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif "accept-encoding" not in vary.lower():
+                headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,185 @@
+import codecs
+import os
+from datetime import date, datetime, time as clock, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dotenv import load_dotenv
+from reminder_scheduler import REMINDER_TIMEZONE
+
+load_dotenv()
+
+# Minimal iCalendar (RFC 5545) reader/writer for calendar import and export.
+# Both directions work on streams: the reader consumes an upload chunk by
+# chunk and yields one event at a time, the writer yields lines as documents
+# arrive, so memory stays bounded by a single event. (Starlette spools the
+# upload to a temporary file before the handler runs; BodyLimitMiddleware
+# caps that at ICS_MAX_BYTES.)
+READ_CHUNK = 64 * 1024
+ICS_MAX_BYTES = int(os.getenv("ICS_MAX_BYTES", 20 * 1024 * 1024))
+# A multi-day all-day event becomes one task per day, up to this many days
+MAX_EVENT_DAYS = 31
+# Recurrence is not expanded: an event carrying any of these is reported as
+# recurring and not imported, rather than imported as its first occurrence
+RECURRENCE_PROPERTIES = ("RRULE", "RDATE", "RECURRENCE-ID")
+PRODID = "-//Assist AI//Calendar//EN"
+
+
+def unescape(value):
+    out, chars = [], iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append("\n" if nxt in ("n", "N") else nxt)
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def escape(value):
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+async def read_lines(upload):
+    """Yield unfolded content lines from an upload, decoding incrementally."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending, current = "", None
+    while True:
+        chunk = await upload.read(READ_CHUNK)
+        text = decoder.decode(chunk or b"", final=not chunk)
+        pending += text
+        *lines, pending = pending.split("\n")
+        if not chunk:
+            lines.append(pending)
+        for line in lines:
+            line = line.rstrip("\r")
+            if line[:1] in (" ", "\t") and current is not None:
+                current += line[1:]  # folded continuation
+                continue
+            if current:
+                yield current
+            current = line
+        if not chunk:
+            break
+    if current:
+        yield current
+
+
+def parse_line(line):
+    """Split 'NAME;PARAM=V:value' into (NAME, {PARAM: V}, value)."""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition("=")
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+
+def parse_moment(value, params):
+    """
+    Return (date, "HH:MM" or None) in REMINDER_TIMEZONE. UTC and TZID times
+    are converted; floating times are taken as wall-clock time.
+    """
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d").date(), None
+    moment = datetime.strptime(value.rstrip("Z")[:15], "%Y%m%dT%H%M%S")
+    zone = None
+    if value.endswith("Z"):
+        zone = timezone.utc
+    elif "TZID" in params:
+        try:
+            zone = ZoneInfo(params["TZID"])
+        except (ZoneInfoNotFoundError, ValueError):
+            zone = None
+    if zone is not None:
+        moment = moment.replace(tzinfo=zone).astimezone(REMINDER_TIMEZONE)
+    return moment.date(), moment.strftime("%H:%M")
+
+
+async def parse_events(lines):
+    """
+    Yield {"uid", "summary", "start", "time", "end", "recurring"} for each
+    VEVENT. Events with an unreadable DTSTART are yielded with start=None so
+    the caller can count them as skipped.
+    """
+    event = None
+    async for line in lines:
+        name, params, value = parse_line(line)
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {"uid": None, "summary": "", "start": None, "time": None, "end": None, "recurring": False}
+        elif event is None:
+            continue
+        elif name == "END" and value.upper() == "VEVENT":
+            yield event
+            event = None
+        elif name == "UID":
+            event["uid"] = value.strip()
+        elif name == "SUMMARY":
+            event["summary"] = unescape(value).strip()
+        elif name in RECURRENCE_PROPERTIES:
+            event["recurring"] = True
+        elif name in ("DTSTART", "DTEND"):
+            try:
+                day, time = parse_moment(value, params)
+            except ValueError:
+                continue
+            if name == "DTSTART":
+                event["start"], event["time"] = day, time
+            else:
+                event["end"] = day
+
+
+def event_days(event):
+    """Days covered by an all-day event; DTEND is exclusive."""
+    start = event["start"]
+    end = event["end"] if event["end"] and event["end"] > start else start + timedelta(days=1)
+    days = min((end - start).days, MAX_EVENT_DAYS)
+    return [start + timedelta(days=i) for i in range(days)]
+
+
+def fold(line):
+    """Fold a content line at 75 octets, never splitting a UTF-8 sequence."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data, limit = data[cut:], 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_event(uid, summary, day, time=None, stamp=None):
+    day = date.fromisoformat(day)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+    ]
+    if time:
+        # UTC, so no VTIMEZONE block is needed for clients to place it
+        moment = datetime.combine(day, clock.fromisoformat(time), REMINDER_TIMEZONE).astimezone(timezone.utc)
+        lines.append(f"DTSTART:{moment.strftime('%Y%m%dT%H%M%SZ')}")
+    else:
+        lines.append(f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}")
+        lines.append(f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}")
+    lines.append(f"SUMMARY:{escape(summary)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def calendar_header(name):
+    return "".join(fold(line) for line in [
+        "BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape(name)}", f"X-WR-TIMEZONE:{REMINDER_TIMEZONE.key}",
+    ])
+
+
+def calendar_footer():
+    return "END:VCALENDAR\r\n"
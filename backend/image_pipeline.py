@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps
+from cache import LRUCache
+
+load_dotenv()
+
+AI_IMAGE_MAX_BYTES = int(os.getenv("AI_IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+AI_IMAGE_MAX_EDGE = int(os.getenv("AI_IMAGE_MAX_EDGE", 1536))
+PROFILE_PICTURE_MAX_BYTES = int(os.getenv("PROFILE_PICTURE_MAX_BYTES", 5 * 1024 * 1024))
+AI_IMAGE_QUALITY = int(os.getenv("AI_IMAGE_QUALITY", 85))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+READ_CHUNK = 64 * 1024
+
+# Decoding and resizing are CPU work, so they never run on the event loop.
+_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+# content hash -> processed JPEG, so a re-sent worksheet photo is free
+_processed = LRUCache(maxsize=int(os.getenv("AI_IMAGE_CACHE_SIZE", 64)), ttl=3600)
+
+
+async def read_upload(upload: UploadFile, max_bytes=AI_IMAGE_MAX_BYTES):
+    """
+    Read an upload in chunks, failing with 413 as soon as it passes max_bytes.
+    This bounds the one file; BodyLimitMiddleware bounds the request body
+    before Starlette spools it.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(READ_CHUNK)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image too large (limit {max_bytes // (1024 * 1024)} MB)"
+            )
+    return bytes(buffer)
+
+
+def downscale(data, max_edge=AI_IMAGE_MAX_EDGE, quality=AI_IMAGE_QUALITY):
+    """
+    Decode, apply the EXIF orientation, shrink to max_edge on the longest
+    side and re-encode as JPEG. Metadata (EXIF, GPS) is not carried over.
+    """
+    img = Image.open(BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_edge, max_edge))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+async def downscale_async(data, max_edge=AI_IMAGE_MAX_EDGE, quality=AI_IMAGE_QUALITY):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, downscale, data, max_edge, quality)
+
+
+async def prepare_image(upload: UploadFile):
+    """
+    Turn a chat upload into a model-ready image. Returns (content hash,
+    PIL image) where the hash is of the original upload bytes.
+    """
+    data = await read_upload(upload)
+    digest = hashlib.sha256(data).hexdigest()
+    processed = _processed.get(digest)
+    if processed is None:
+        processed = await downscale_async(data)
+        _processed.set(digest, processed)
+    return digest, Image.open(BytesIO(processed))
+
+
+def stats():
+    return _processed.info()
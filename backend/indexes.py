@@ -0,0 +1,113 @@
+"""
+Index declarations for every collection the routers query, applied at
+startup, plus an explain-based check that each router query is served by
+an index instead of a collection scan.
+
+    python indexes.py            # apply indexes and check plans (uses MONGODB_URI)
+"""
+import asyncio
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from database import DB
+from jobs import JOB_INDEXES
+
+DEMO_TEACHER = "demo_teacher@school.com"
+
+# collection -> indexes. Names are fixed so re-running is a no-op.
+INDEXES = {
+    "teachers": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "subjects": [
+        IndexModel([("teacher_email", ASCENDING), ("id", ASCENDING)], name="teacher_id"),
+    ],
+    "reminders": [
+        IndexModel([("teacher_email", ASCENDING), ("id", ASCENDING)], name="teacher_id"),
+        IndexModel([("teacher_email", ASCENDING), ("date", ASCENDING), ("id", ASCENDING)], name="teacher_date_id"),
+        IndexModel([("date", ASCENDING)], name="date"),  # scheduler rehydration
+        # ICS import dedupe; only imported reminders carry a uid
+        IndexModel([("teacher_email", ASCENDING), ("uid", ASCENDING)], name="teacher_uid_unique",
+                   unique=True, partialFilterExpression={"uid": {"$exists": True}}),
+    ],
+    "feedback": [
+        IndexModel([("teacher_email", ASCENDING), ("id", ASCENDING)], name="teacher_id"),
+        IndexModel([("teacher_email", ASCENDING), ("date", DESCENDING), ("id", DESCENDING)], name="teacher_date_id"),
+    ],
+    "notes": [
+        IndexModel([("date", DESCENDING), ("id", DESCENDING)], name="date_id"),
+    ],
+    "tasks": [
+        IndexModel([("date", ASCENDING), ("id", ASCENDING)], name="date_id"),
+        IndexModel([("uid", ASCENDING)], name="uid_unique",
+                   unique=True, partialFilterExpression={"uid": {"$exists": True}}),
+    ],
+    "jobs": JOB_INDEXES,  # also created by job_queue before it takes work
+}
+
+# The queries the routers actually run: (collection, filter, sort).
+ROUTER_QUERIES = [
+    ("teachers", {"email": DEMO_TEACHER}, None),
+    ("subjects", {"teacher_email": DEMO_TEACHER}, [("id", ASCENDING)]),
+    ("subjects", {"id": "x", "teacher_email": DEMO_TEACHER}, None),
+    ("reminders", {"teacher_email": DEMO_TEACHER}, [("date", ASCENDING), ("id", ASCENDING)]),
+    ("reminders", {"id": "x", "teacher_email": DEMO_TEACHER}, None),
+    ("reminders", {"teacher_email": DEMO_TEACHER, "date": {"$gte": "2024-06-01", "$lte": "2024-06-31"}}, None),
+    ("reminders", {"date": {"$gte": "2024-06-01", "$lte": "2024-06-03"}}, None),
+    ("feedback", {"teacher_email": DEMO_TEACHER}, [("date", DESCENDING), ("id", DESCENDING)]),
+    ("feedback", {"id": "x", "teacher_email": DEMO_TEACHER}, None),
+    ("notes", {}, [("date", DESCENDING), ("id", DESCENDING)]),
+    ("tasks", {}, [("date", ASCENDING), ("id", ASCENDING)]),
+]
+
+
+async def ensure_indexes(db=DB):
+    """Create every declared index. create_indexes is idempotent for identical specs."""
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except Exception as e:
+            print(f"Index Error ({collection}): {e}")
+
+
+def plan_stages(plan):
+    plan = plan.get("queryPlan", plan)  # slot-based engine nests the classic plan
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+last_scans = None
+
+
+async def check_query_plans(db=DB, queries=ROUTER_QUERIES):
+    """Return the router queries whose winning plan contains a COLLSCAN."""
+    global last_scans
+    scans = []
+    for collection, query, sort in queries:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        try:
+            explained = await db.command("explain", command, verbosity="queryPlanner")
+        except Exception as e:
+            print(f"Explain Error ({collection} {query}): {e}")
+            continue
+        stages = plan_stages(explained["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            scans.append({"collection": collection, "filter": query, "sort": sort, "stages": stages})
+    for scan in scans:
+        print(f"Warning: COLLSCAN on {scan['collection']} for {scan['filter']} sort={scan['sort']}")
+    last_scans = scans
+    return scans
+
+
+async def bootstrap(db=DB):
+    await ensure_indexes(db)
+    return await check_query_plans(db)
+
+
+if __name__ == "__main__":
+    scans = asyncio.run(bootstrap())
+    print("All router queries are indexed." if not scans else f"{len(scans)} queries scan a collection.")
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import deadlines
+from database import jobs_collection
+
+load_dotenv()
+
+# Background jobs persisted in Mongo. A job is claimed with a lease; if its
+# worker dies (deploy, crash) the job stays "running" until the lease runs
+# out, and then any worker picks it up again. Jobs are kept for JOB_TTL_SECONDS.
+# An idempotency key deduplicates only while its job is queued or running:
+# the job holds it as `live_key` until it finishes, so sending the same
+# request again after that starts a new job.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 120))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 2))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 86400))
+# A failed attempt waits this long per attempt (or the Retry-After of a 503)
+JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", 10))
+
+FINISHED = ("done", "failed")
+
+JOB_INDEXES = [
+    # idempotency; finished jobs drop live_key, so they never collide
+    IndexModel([("live_key", ASCENDING)], name="live_key_unique",
+               unique=True, partialFilterExpression={"live_key": {"$exists": True}}),
+    IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+    IndexModel([("created_at", ASCENDING)], name="created_ttl", expireAfterSeconds=JOB_TTL_SECONDS),
+]
+# Unique on `key` for good, so a finished job blocked its key until it expired
+RETIRED_JOB_INDEXES = ["key_unique"]
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def public(job):
+    """The part of a job document that is returned to clients."""
+    view = {"job_id": job["_id"], "kind": job["kind"], "status": job["status"]}
+    if job["status"] == "done":
+        view["result"] = job.get("result")
+    if job["status"] == "failed":
+        view["error"] = job.get("error")
+    return view
+
+
+class JobQueue:
+    def __init__(self, collection, workers=JOB_WORKERS):
+        self.collection = collection
+        self.workers = workers
+        self._handlers = {}  # kind -> async handler(payload, job_id, context)
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._changed = {}  # job id -> event set when this process updates it
+        self.context = None
+        self._indexed = False
+        self._index_lock = asyncio.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    async def ensure_indexes(self):
+        """
+        Create the jobs indexes once per process. Deduplication rests on the
+        unique index, so enqueue() waits for it rather than for the
+        background index bootstrap.
+        """
+        if self._indexed:
+            return
+        async with self._index_lock:
+            if self._indexed:
+                return
+            for name in RETIRED_JOB_INDEXES:
+                try:
+                    await self.collection.drop_index(name)
+                except OperationFailure:
+                    pass  # already gone
+            await self.collection.create_indexes(JOB_INDEXES)
+            self._indexed = True
+
+    async def start(self, context=None):
+        self.context = context
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            # Not fatal here: the first enqueue() tries again
+            print(f"Job Index Error: {e}")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, kind, payload, key):
+        """Create a job, or return the queued or running one already holding `key`."""
+        await self.ensure_indexes()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "key": key,
+            "live_key": key,
+            "status": "queued",
+            "payload": payload,
+            "attempts": 0,
+            "created_at": now(),
+            "updated_at": now(),
+        }
+        try:
+            await self.collection.insert_one(job)
+        except DuplicateKeyError:
+            live = await self.collection.find_one({"live_key": key})
+            if live is None:
+                # It finished between our insert and this read: the key is free
+                return await self.enqueue(kind, payload, key)
+            self.deduplicated += 1
+            return live
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id):
+        return await self.collection.find_one({"_id": job_id})
+
+    async def wait(self, job_id, timeout):
+        """Wait up to `timeout` for a change made by this process, then re-read the job."""
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if self._changed.get(job_id) is event:
+                del self._changed[job_id]
+        return await self.get(job_id)
+
+    def _notify(self, job_id):
+        event = self._changed.pop(job_id, None)
+        if event:
+            event.set()
+
+    async def _claim(self):
+        current = now()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_after": {"$not": {"$gt": current}}},
+                {"status": "running", "lease_until": {"$lt": current}},  # abandoned by a dead worker
+            ]},
+            {"$set": {
+                "status": "running",
+                "lease_until": current + timedelta(seconds=JOB_LEASE_SECONDS),
+                "updated_at": current,
+            }, "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _finish(self, job, update):
+        update["updated_at"] = now()
+        unset = {"lease_until": ""}
+        if update["status"] in FINISHED:
+            unset["live_key"] = ""  # frees the key for the next request
+        # Matching on attempts keeps a worker that overran its lease from
+        # overwriting the result of the worker that took the job over.
+        await self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "attempts": job["attempts"]},
+            {"$set": update, "$unset": unset}
+        )
+        self._notify(job["_id"])
+
+    async def _run(self, job):
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            await self._finish(job, {"status": "failed", "error": f"No handler for {job['kind']}"})
+            return
+        try:
+            # A job gets the lease as its deadline, so it gives up (and is
+            # retried) rather than keep working on a job another worker has
+            # already taken over
+            with deadlines.scope(JOB_LEASE_SECONDS):
+                result = await handler(job["payload"], job["_id"], self.context)
+        except asyncio.CancelledError:
+            raise  # shutdown: the lease expires and another worker retries
+        except Exception as e:
+            print(f"Job Error ({job['kind']} {job['_id']}): {e}")
+            if job["attempts"] >= JOB_MAX_ATTEMPTS:
+                self.failed += 1
+                await self._finish(job, {"status": "failed", "error": str(e)})
+            else:
+                delay = JOB_RETRY_SECONDS * job["attempts"]
+                retry_after = (getattr(e, "headers", None) or {}).get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = int(retry_after)
+                await self._finish(job, {
+                    "status": "queued",
+                    "error": str(e),
+                    "run_after": now() + timedelta(seconds=delay),
+                })
+            return
+        self.completed += 1
+        await self._finish(job, {"status": "done", "result": result})
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job Queue Error: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    def stats(self):
+        return {
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "deduplicated": self.deduplicated,
+        }
+
+
+job_queue = JobQueue(jobs_collection)
@@ -0,0 +1,111 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+LANG_NAMES = {
+    "kn": "Kannada", "hi": "Hindi", "ta": "Tamil", "te": "Telugu",
+    "ml": "Malayalam", "mr": "Marathi", "bn": "Bengali", "gu": "Gujarati",
+    "pa": "Punjabi", "or": "Odia", "ur": "Urdu", "en": "English"
+}
+
+# Unicode blocks of the scripts we support, mapped to the LANG_NAMES code
+# they identify. Devanagari is shared by Hindi and Marathi, and Latin covers
+# both English and romanized Hindi, so those two go through n-gram profiles.
+# Every Indic block is 128 code points wide, so `ord(ch) >> 7` finds it.
+SCRIPT_BLOCKS = {
+    0x0600 >> 7: "ur", 0x0680 >> 7: "ur",
+    0x0900 >> 7: "deva",
+    0x0980 >> 7: "bn",
+    0x0A00 >> 7: "pa",
+    0x0A80 >> 7: "gu",
+    0x0B00 >> 7: "or",
+    0x0B80 >> 7: "ta",
+    0x0C00 >> 7: "te",
+    0x0C80 >> 7: "kn",
+    0x0D00 >> 7: "ml",
+}
+
+# Small seed texts of very common words; enough to separate the pairs
+# above on short classroom messages.
+PROFILE_SEEDS = {
+    "hi": "है हैं का की के में और यह वह नहीं क्या कैसे को से पर था थी बच्चों बच्चे छात्र समझाओ कक्षा आज",
+    "mr": "आहे आहेत आणि हे ते नाही काय कसे ला ने मध्ये होते होती मुलांना मुले विद्यार्थी समजावून वर्ग आज",
+    "en": "the is are and of to in what how why explain students class today with for this that teach lesson",
+    "hi_latn": "hai hain ka ki ke mein aur yeh woh nahi kya kaise ko se par tha thi bachche samjhao kaksha aaj",
+}
+PROFILE_CODES = {"hi": "hi", "mr": "mr", "en": "en", "hi_latn": "hi"}
+
+
+# Whitespace, digits and punctuation; a plain [^\w] would also strip the
+# vowel signs and viramas that Indic words are built from.
+NON_WORD = re.compile(r"[\s\d!-/:-@\[-`{-~।॥]+")
+
+
+def script_counts(text):
+    counts = Counter()
+    for ch in text:
+        cp = ord(ch)
+        if cp < 0x80:
+            if ch.isalpha():
+                counts["latn"] += 1
+        else:
+            script = SCRIPT_BLOCKS.get(cp >> 7)
+            if script:
+                counts[script] += 1
+    return counts
+
+
+def trigrams(text):
+    padded = " " + NON_WORD.sub(" ", text.casefold()).strip() + " "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=None)
+def profile(name):
+    return trigrams(PROFILE_SEEDS[name])
+
+
+def best_profile(text, candidates):
+    grams = trigrams(text)
+    scores = {name: sum(min(n, profile(name).get(g, 0)) for g, n in grams.items()) for name in candidates}
+    name = max(scores, key=scores.get)
+    return PROFILE_CODES[name] if scores[name] > 0 else None
+
+
+def detect_language(text, default="en"):
+    """
+    Guess the LANG_NAMES code of `text` from its dominant script. Returns
+    `default` when the text has no letters or the guess is inconclusive.
+    """
+    if not text:
+        return default
+    counts = script_counts(text)
+    if not counts:
+        return default
+    script = counts.most_common(1)[0][0]
+    if script == "deva":
+        return best_profile(text, ("hi", "mr")) or "hi"
+    if script == "latn":
+        return best_profile(text, ("en", "hi_latn")) or default
+    return script
+
+
+def resolve_language(requested, text, supported=LANG_NAMES):
+    """
+    Pick the reply language for a message. A non-Latin script in the text
+    wins over the client's selection (a teacher typing Kannada with the UI
+    left on English wants Kannada back); otherwise the client's supported
+    choice is kept, and "auto" or unknown values fall back to detection.
+    """
+    counts = script_counts(text or "")
+    script = counts.most_common(1)[0][0] if counts else None
+    if script == "deva" and requested in ("hi", "mr"):
+        return requested
+    if script and script != "latn":
+        detected = detect_language(text)
+        if detected in supported:
+            return detected
+    if requested in supported:
+        return requested
+    detected = detect_language(text)
+    return detected if detected in supported else "en"
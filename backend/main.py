@@ -1,27 +1,81 @@
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
+import ai_executor
+import image_pipeline
+import auth
+import indexes
+import translation
+from reminder_scheduler import scheduler as reminder_scheduler
+from jobs import job_queue
+from ai_clients import AIClients
+from http_cache import HTTPCacheMiddleware
+from deadlines import DeadlineMiddleware
+from body_limits import BodyLimitMiddleware
 from routers import teacher, admin, ai, dashboard, calendar, feedback
 
 load_dotenv()
 
-app = FastAPI(title="Assist AI Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ai_clients = AIClients()
+    app.state.ai_clients.connect()
+    # Index bootstrap runs in the background so a slow database does not
+    # hold up startup; query plans are checked once the indexes exist.
+    index_task = asyncio.create_task(indexes.bootstrap())
+    # The scheduler rehydrates upcoming reminders from Mongo on its first tick
+    await reminder_scheduler.start()
+    # Workers also resume jobs left queued or running by a previous process
+    await job_queue.start(app)
+    yield
+    await job_queue.stop()
+    await reminder_scheduler.stop()
+    index_task.cancel()
+    await app.state.ai_clients.close()
+
+app = FastAPI(title="Assist AI Backend", lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
 
+# Upload size caps, checked before the body is spooled; inside CORS so the
+# browser can read the 413
+app.add_middleware(BodyLimitMiddleware)
+
+# Per-request deadline (X-Request-Timeout or the route default), inside
+# everything but the upload caps so it bounds the handler and its Mongo,
+# Gemini and HF calls
+app.add_middleware(DeadlineMiddleware)
+
+# Conditional GETs and compression; added first so CORS wraps its 304s too
+app.add_middleware(HTTPCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+@app.exception_handler(PyMongoError)
+async def mongo_error(request: Request, exc: PyMongoError):
+    # With a deadline in scope the driver sends maxTimeMS and gives up on
+    # its own once the request's budget is spent
+    if exc.timeout:
+        return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+    print(f"Database Error: {exc}")
+    return JSONResponse(status_code=500, content={"detail": "Database error"})
+
 app.include_router(teacher.router, prefix="/api/teacher", tags=["teacher"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
@@ -32,3 +86,19 @@ app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 @app.get("/")
 async def root():
     return {"message": "Assist AI Backend Running -- RELOAD CONFIRMED"}
+
+# Internal counters (cache sizes, queue depths, slow-query scans): admins only
+@app.get("/api/metrics", dependencies=[Depends(auth.get_current_admin)])
+async def metrics():
+    return {
+        "ai_executor": ai_executor.stats(),
+        "ai_answer_cache": ai.answer_cache.info(),
+        "ai_image_cache": image_pipeline.stats(),
+        "password_pool": auth.password_pool_stats(),
+        "token_cache": auth.token_cache_stats(),
+        "profile_cache": teacher.profile_cache.info(),
+        "collection_scans": indexes.last_scans,
+        "reminder_scheduler": reminder_scheduler.stats(),
+        "jobs": job_queue.stats(),
+        "hf_resilience": translation.hf_resilience.stats(),
+    }
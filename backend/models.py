@@ -15,6 +15,15 @@ class TeacherModel(BaseModel):
     preferred_language: str = "en"
     profile_picture: Optional[str] = None
 
+class TeacherProfile(BaseModel):
+    """What the profile endpoints return and cache: the teacher without the password hash."""
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: str
+    email: EmailStr
+    school: str
+    preferred_language: str = "en"
+    profile_picture: Optional[str] = None
+
 class AdminSessionModel(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     email: EmailStr
@@ -0,0 +1,76 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+
+# Keyset (cursor) pagination shared by the list endpoints. A page is fetched
+# with a range condition on the sort keys of the last item seen, so page N
+# walks the same index range as page 1 instead of skipping N * limit rows.
+# List bodies keep their old shape; the next cursor travels in a header.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 200
+
+
+class PageParams:
+    def __init__(self, limit: int, cursor: Optional[str]):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def page_params(default_limit: int):
+    """Build a dependency reading ?limit= and ?cursor= with a per-endpoint default."""
+    def dependency(
+        limit: int = Query(default_limit, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None)
+    ):
+        return PageParams(limit, cursor)
+    return dependency
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(sort, values):
+    """
+    Condition selecting rows strictly after `values` in `sort` order, e.g. for
+    [("date", -1), ("id", -1)]:
+        {"$or": [{"date": {"$lt": d}}, {"date": d, "id": {"$lt": i}}]}
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        branch = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        branch[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        branches.append(branch)
+    return {"$or": branches}
+
+
+async def fetch_page(collection, query, sort, page: PageParams, response: Optional[Response] = None, projection=None):
+    """
+    Return (items, next_cursor) for one page. The sort must end in a unique
+    field (our `id`) so the cursor position is unambiguous.
+    """
+    if page.cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(page.cursor, len(sort)))]}
+    cursor = collection.find(query, projection).sort(sort).limit(page.limit + 1)
+    items = await cursor.to_list(length=page.limit + 1)
+
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        next_cursor = encode_cursor([items[-1].get(field) for field, _ in sort])
+    if response is not None and next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items, next_cursor
@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+from database import reminders_collection
+
+load_dotenv()
+
+# Reminder dates/times are wall-clock strings entered by the teacher.
+REMINDER_TIMEZONE = ZoneInfo(os.getenv("REMINDER_TIMEZONE", "Asia/Kolkata"))
+# Reminders without a time fire at this time of day
+REMINDER_DEFAULT_TIME = os.getenv("REMINDER_DEFAULT_TIME", "09:00")
+# Only reminders due within the horizon are held in memory; the window is
+# reloaded from Mongo every refresh interval, which also picks up changes
+# made through other workers (additions, moves and deletions).
+SCHEDULER_HORIZON_HOURS = int(os.getenv("SCHEDULER_HORIZON_HOURS", 48))
+SCHEDULER_REFRESH_SECONDS = int(os.getenv("SCHEDULER_REFRESH_SECONDS", 300))
+# Events missed by up to this much (e.g. during a restart) still fire
+SCHEDULER_GRACE_SECONDS = int(os.getenv("SCHEDULER_GRACE_SECONDS", 120))
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def due_timestamp(reminder):
+    try:
+        moment = datetime.strptime(
+            f"{reminder['date']} {reminder.get('time') or REMINDER_DEFAULT_TIME}", "%Y-%m-%d %H:%M"
+        )
+    except (KeyError, ValueError):
+        return None
+    return moment.replace(tzinfo=REMINDER_TIMEZONE).timestamp()
+
+
+class ReminderScheduler:
+    """
+    Min-heap of upcoming reminders that pushes each one to the connected
+    clients of its teacher when it falls due. Deletions are lazy: the entry
+    map is the source of truth and stale heap items are skipped on pop.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._heap = []  # (due timestamp, reminder id)
+        self._entries = {}  # reminder id -> (due timestamp, reminder)
+        self._fired = {}  # reminder id -> due timestamp, kept for the grace window
+        self._subscribers = {}  # teacher email -> set of queues
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._touched = None  # ids scheduled here while a rehydrate query runs
+        self.delivered = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def rehydrate(self):
+        now = time.time()
+        start = datetime.fromtimestamp(now - SCHEDULER_GRACE_SECONDS, REMINDER_TIMEZONE)
+        end = datetime.fromtimestamp(now + SCHEDULER_HORIZON_HOURS * 3600, REMINDER_TIMEZONE)
+        query = {"date": {"$gte": start.strftime("%Y-%m-%d"), "$lte": end.strftime("%Y-%m-%d")}}
+        seen = set()
+        self._touched = set()
+        try:
+            async for reminder in self.collection.find(query, {"_id": 0}):
+                seen.add(reminder["id"])
+                if reminder["id"] not in self._touched:  # a local change meanwhile is newer
+                    self.schedule(reminder)
+            touched = self._touched
+        finally:
+            self._touched = None
+        # Every held entry falls inside the queried dates, so one the query
+        # did not return was deleted or moved away through another worker.
+        # Entries scheduled here meanwhile may postdate the query and stay.
+        for reminder_id in [k for k in self._entries if k not in seen and k not in touched]:
+            del self._entries[reminder_id]
+
+    def schedule(self, reminder):
+        if self._touched is not None:
+            self._touched.add(reminder.get("id"))
+        due = due_timestamp(reminder)
+        if due is None:
+            return
+        now = time.time()
+        if due < now - SCHEDULER_GRACE_SECONDS or due > now + SCHEDULER_HORIZON_HOURS * 3600:
+            return
+        if self._fired.get(reminder["id"]) == due:
+            return
+        current = self._entries.get(reminder["id"])
+        self._entries[reminder["id"]] = (due, reminder)
+        if current is None or current[0] != due:
+            heapq.heappush(self._heap, (due, reminder["id"]))
+            self._wakeup.set()
+
+    def cancel(self, reminder_id):
+        if self._touched is not None:
+            self._touched.add(reminder_id)
+        self._entries.pop(reminder_id, None)
+
+    def subscribe(self, teacher_email):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(teacher_email, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, teacher_email, queue):
+        queues = self._subscribers.get(teacher_email)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[teacher_email]
+
+    def _deliver(self, reminder):
+        for queue in self._subscribers.get(reminder.get("teacher_email"), ()):
+            try:
+                queue.put_nowait(reminder)
+            except asyncio.QueueFull:
+                pass  # a stalled client misses the event rather than stalling us
+        self.delivered += 1
+
+    def _fire_due(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            due, reminder_id = heapq.heappop(self._heap)
+            entry = self._entries.get(reminder_id)
+            if entry is None or entry[0] != due:
+                continue
+            del self._entries[reminder_id]
+            self._fired[reminder_id] = due
+            self._deliver(entry[1])
+        # Forget fired reminders once a refresh can no longer pick them up again
+        horizon = now - SCHEDULER_GRACE_SECONDS
+        for reminder_id in [k for k, due in self._fired.items() if due < horizon]:
+            del self._fired[reminder_id]
+
+    async def _run(self):
+        next_refresh = 0
+        while True:
+            try:
+                if time.time() >= next_refresh:
+                    await self.rehydrate()
+                    next_refresh = time.time() + SCHEDULER_REFRESH_SECONDS
+                self._fire_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Reminder Scheduler Error: {e}")
+                next_refresh = time.time() + 30
+
+            wait = next_refresh - time.time()
+            if self._heap:
+                wait = min(wait, self._heap[0][0] - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {
+            "scheduled": len(self._entries),
+            "heap": len(self._heap),
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+            "delivered": self.delivered,
+        }
+
+
+scheduler = ReminderScheduler(reminders_collection)
@@ -0,0 +1,206 @@
+import asyncio
+import random
+import time
+from collections import deque
+import deadlines
+
+# Retry, hedging and circuit breaking shared by the Gemini and Hugging Face
+# calls. Each provider gets one Resilience instance per process, so the
+# breaker and the latency history reflect every request to that upstream.
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class UpstreamError(Exception):
+    """A response that is worth retrying (429, 5xx, model still loading)."""
+
+    def __init__(self, status, detail=""):
+        super().__init__(f"upstream returned {status} {detail}".strip())
+        self.status = status
+
+
+class CircuitBreaker:
+    """
+    Closed: calls flow; `threshold` consecutive failures open the circuit.
+    Open: calls fail at once for `reset_after` seconds.
+    Half-open: one trial call is let through; success closes the circuit,
+    failure opens it again. A trial that never reports back within
+    `trial_timeout` seconds is written off and another call may try.
+    """
+
+    def __init__(self, name, threshold=5, reset_after=30.0, trial_timeout=60.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.trial_timeout = trial_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._trial_started = 0.0
+        self._trial_id = 0
+        self.rejected = 0
+
+    def allow(self):
+        """
+        Raise CircuitOpen, or admit the call. Returns a token when the call
+        is the half-open trial (None otherwise), to hand back to cancelled().
+        """
+        if self.state == "open":
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_after:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.reset_after - waited)
+            self.state = "half_open"
+            self._trial = False
+        if self.state == "half_open":
+            if self._trial and time.monotonic() - self._trial_started < self.trial_timeout:
+                self.rejected += 1
+                raise CircuitOpen(self.name, 1)
+            self._trial = True
+            self._trial_started = time.monotonic()
+            self._trial_id += 1
+            return self._trial_id
+        return None
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial = False
+
+    def cancelled(self, trial):
+        # A trial call that was abandoned, or failed for a reason unrelated
+        # to the upstream, proves nothing either way. Only the call holding
+        # the trial may give it up; other calls' cancellations leave it be.
+        if trial is not None and trial == self._trial_id:
+            self._trial = False
+
+    def failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class LatencyWindow:
+    """Recent successful call latencies, for the hedging threshold."""
+
+    def __init__(self, size=200):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class Resilience:
+    """
+    Wraps an async call with, in order: a circuit breaker check, an optional
+    hedged duplicate once the call outlives the recent p95, and jittered
+    exponential retry for errors `retryable` accepts. Other errors pass
+    through untouched and do not count against the circuit.
+    """
+
+    def __init__(self, name, retryable, attempts=3, base_delay=0.5, max_delay=8.0,
+                 hedge=False, hedge_quantile=95, hedge_min_samples=20,
+                 breaker_threshold=5, breaker_reset=30.0):
+        self.name = name
+        self.retryable = retryable
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(name, breaker_threshold, breaker_reset)
+        self.latency = LatencyWindow()
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def backoff(self, attempt):
+        # "Full jitter": spreads retries from many callers over the window
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def hedge_delay(self):
+        if not self.hedge or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_quantile)
+
+    async def _hedged(self, func, delay):
+        first = asyncio.ensure_future(func())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges += 1
+                tasks.append(asyncio.ensure_future(func()))
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call(self, func):
+        """Run `func()` (an async callable) under the policy."""
+        for attempt in range(self.attempts):
+            deadlines.check()
+            trial = self.breaker.allow()
+            start = time.perf_counter()
+            try:
+                delay = self.hedge_delay()
+                result = await (self._hedged(func, delay) if delay is not None else func())
+            except asyncio.CancelledError:
+                self.breaker.cancelled(trial)
+                raise
+            except Exception as e:
+                if deadlines.expired():
+                    # Our budget ran out, which says nothing about the upstream
+                    self.breaker.cancelled(trial)
+                    raise deadlines.DeadlineExceeded() from e
+                if not self.retryable(e):
+                    self.breaker.cancelled(trial)  # says nothing about upstream health
+                    raise
+                self.breaker.failure()
+                delay = self.backoff(attempt)
+                if attempt == self.attempts - 1 or deadlines.budget(delay) < delay:
+                    raise  # out of attempts, or no time left to make another
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.success()
+            self.latency.add(time.perf_counter() - start)
+            return result
+
+    def stats(self):
+        p95 = self.latency.percentile(95)
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "rejected": self.breaker.rejected,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
@@ -1,32 +1,25 @@
 import os
-import requests
+import re
+import hashlib
 import json
-from fastapi import APIRouter, Form, UploadFile, File, HTTPException
-from google import genai
+from fastapi import APIRouter, Form, UploadFile, File, HTTPException, Depends
 from google.genai import types
-from langdetect import detect, LangDetectException
 from dotenv import load_dotenv
 from typing import Optional
-from io import BytesIO
-from PIL import Image
+from ai_executor import generate_content, stream_content, admission
+from cache import build_cache
+from ai_clients import AIClients, get_ai_clients
+import deadlines
+from auth import get_current_admin
+from translation import TRANSLATION_MODEL, translate, translate_texts
+from lang_detect import LANG_NAMES, resolve_language
+from image_pipeline import prepare_image
+from sse import sse_event, sse_response
 
 load_dotenv()
 
 router = APIRouter()
 
-GEMINI_KEY = os.getenv("GEMINI_API_KEY")
-HF_KEY = os.getenv("HF_API_KEY")
-
-# Initialize Gemini Client
-client = None
-if GEMINI_KEY:
-    try:
-        client = genai.Client(api_key=GEMINI_KEY)
-    except Exception as e:
-        print(f"Gemini Client Init Error: {e}")
-else:
-    print("Warning: GEMINI_API_KEY not found in env")
-
 # Prompts
 SYSTEM_PROMPT = """
 AI Teaching Assistant (Instant Classroom Help)
@@ -65,85 +58,114 @@ Tone: Encouraging, practical, and concise.
 IMPORTANT: The values in the JSON must be in the SAME LANGUAGE as the user's input.
 """
 
-# Translation Config
-HF_HEADERS = {"Authorization": f"Bearer {HF_KEY}"}
+# Answer cache for repeated classroom questions. The prompt version is derived
+# from the system prompt, so editing the prompt invalidates old answers.
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", 24 * 3600))
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", 2048))
+answer_cache = build_cache("ai_answers", os.getenv("AI_CACHE_BACKEND"), maxsize=AI_CACHE_SIZE, ttl=AI_CACHE_TTL)
+
+def normalize_question(message):
+    text = re.sub(r"\s+", " ", message).strip().casefold()
+    return text.rstrip("?.!।")
+
+def answer_cache_key(mode, lang_code, message):
+    raw = "|".join([mode, lang_code, PROMPT_VERSION, normalize_question(message)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
+# Translation Config
 LANG_MAP = {
     "kn": "kan_Knda", "hi": "hin_Deva", "ta": "tam_Taml", "te": "tel_Telu",
     "ml": "mal_Mlym", "mr": "mar_Deva", "bn": "ben_Beng", "gu": "guj_Gujr",
     "pa": "pan_Guru", "or": "ory_Orya", "ur": "urd_Arab", "en": "eng_Latn"
 }
 
-LANG_NAMES = {
-    "kn": "Kannada", "hi": "Hindi", "ta": "Tamil", "te": "Telugu",
-    "ml": "Malayalam", "mr": "Marathi", "bn": "Bengali", "gu": "Gujarati",
-    "pa": "Punjabi", "or": "Odia", "ur": "Urdu", "en": "English"
-}
-
-def translate(text, model, src_lang, tgt_lang):
-    url = f"https://router.huggingface.co/models/{model}"
-    payload = {
-        "inputs": text,
-        "parameters": {
-            "src_lang": src_lang,
-            "tgt_lang": tgt_lang
-        }
-    }
-    
-    try:
-        r = requests.post(url, headers=HF_HEADERS, json=payload, timeout=60)
-        data = r.json()
-        if isinstance(data, list) and len(data) > 0:
-            return data[0]["translation_text"]
-        elif isinstance(data, dict) and "error" in data:
-            print(f"HF Error: {data['error']}")
-            return text 
-        return text
-    except Exception as e:
-        print(f"Translation Exception: {e}")
-        return text
-
-# Legacy functions preserved if needed, but not used in main flow anymore
-def to_english(text, lang):
+# Legacy functions preserved if needed, but not used in main flow anymore.
+# `http` is the pooled client from the AIClients registry.
+async def to_english(http, text, lang):
     if lang == "en":
         return text
     src_code = LANG_MAP.get(lang, "kan_Knda") 
-    return translate(text, "facebook/nllb-200-distilled-600M", src_code, "eng_Latn")
+    return await translate(http, text, TRANSLATION_MODEL, src_code, "eng_Latn")
 
-def from_english(text, lang):
+async def from_english(http, text, lang):
     if lang == "en":
         return text
     tgt_code = LANG_MAP.get(lang, "kan_Knda")
-    return translate(text, "facebook/nllb-200-distilled-600M", "eng_Latn", tgt_code)
+    return await translate(http, text, TRANSLATION_MODEL, "eng_Latn", tgt_code)
 
-def translate_json(data, lang):
+async def translate_json(http, data, lang):
     if lang == "en":
         return data
-    translated = {}
-    for key, value in data.items():
-        if isinstance(value, str):
-            translated[key] = from_english(value, lang)
-        else:
-            translated[key] = value
+    # All string fields go upstream together in one batched request
+    keys = [key for key, value in data.items() if isinstance(value, str)]
+    tgt_code = LANG_MAP.get(lang, "kan_Knda")
+    values = await translate_texts(http, [data[k] for k in keys], TRANSLATION_MODEL, "eng_Latn", tgt_code)
+    translated = dict(data)
+    translated.update(zip(keys, values))
     return translated
 
+async def sse_cached(reply):
+    yield sse_event({"delta": reply})
+    yield sse_event({"reply": reply, "type": "text"}, event="done")
+
+async def sse_reply(client, chat_content, cache_key=None):
+    # Server-Sent Events: one "data" event per chunk, then a "done" event
+    # carrying the full reply in the same shape as the JSON response.
+    parts = []
+    try:
+        async for text in stream_content(client, chat_content):
+            parts.append(text)
+            yield sse_event({"delta": text})
+        reply = "".join(parts).strip()
+        if cache_key and reply:
+            await answer_cache.set(cache_key, reply)
+        yield sse_event({"reply": reply, "type": "text"}, event="done")
+    except Exception as e:
+        print(f"Chat Stream Error: {e}")
+        yield sse_event({"reply": f"Sorry, I encountered an error: {str(e)}"}, event="error")
+
+@router.get("/health", dependencies=[Depends(get_current_admin)])
+async def health(clients: AIClients = Depends(get_ai_clients)):
+    return clients.health()
+
+@router.post("/reconnect", dependencies=[Depends(get_current_admin)])
+async def reconnect(clients: AIClients = Depends(get_ai_clients)):
+    await clients.reconnect()
+    return clients.health()
+
 @router.post("/chat")
 async def chat(
     message: Optional[str] = Form(None), 
     image: Optional[UploadFile] = File(None),
     language: Optional[str] = Form("en"),
-    mode: Optional[str] = Form("chat")
+    mode: Optional[str] = Form("chat"),
+    stream: Optional[bool] = Form(False),
+    clients: AIClients = Depends(get_ai_clients)
 ):
     try:
+        client = clients.gemini
         if not client:
              return {"reply": "Server misconfiguration: API Key missing or Client failed."}
 
         if not message and not image:
             return {"reply": "Please provide a message or an image."}
 
-        # 1. Determine Language Name for Prompting
-        lang_code = language if language in LANG_NAMES else "en"
+        # 1. Determine Language Name for Prompting (the script of the
+        # message overrides the UI selection, see lang_detect)
+        lang_code = resolve_language(language, message)
         lang_name = LANG_NAMES.get(lang_code, "English")
+
+        # Plain text questions are answered from cache when possible;
+        # image uploads and reflections are always unique, so they bypass it.
+        cache_key = None
+        if mode != "reflection" and not image:
+            cache_key = answer_cache_key(mode, lang_code, message)
+            cached_reply = await answer_cache.get(cache_key)
+            if cached_reply is not None:
+                if stream:
+                    return sse_response(sse_cached(cached_reply))
+                return {"reply": cached_reply, "type": "text"}
         
         # 2. Prepare Content
         chat_content = []
@@ -161,24 +183,27 @@ async def chat(
 
         if image:
             try:
-                img_data = await image.read()
-                img = Image.open(BytesIO(img_data))
+                _, img = await prepare_image(image)
                 chat_content.append(img)
+            except HTTPException:
+                raise
             except Exception as e:
                 print(f"Image processing error: {e}")
 
         # 3. Generate Content
+        if stream and mode != "reflection":
+            # Refuse while the status code can still say so; once the
+            # stream has started an overload can only be an error event.
+            admission.check()
+            return sse_response(sse_reply(client, chat_content, cache_key))
+
         config = None
         if mode == "reflection":
             config = types.GenerateContentConfig(
                 response_mime_type="application/json"
             )
 
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=chat_content,
-            config=config
-        )
+        response = await generate_content(client, chat_content, config=config)
         
         # 4. Process Response
         generated_text = response.text.strip()
@@ -192,8 +217,13 @@ async def chat(
                 return {"reply": {"acknowledgement": generated_text}, "type": "json"}
         else:
             # Direct response (multilingual by default now)
+            if cache_key and generated_text:
+                await answer_cache.set(cache_key, generated_text)
             return {"reply": generated_text, "type": "text"}
 
+    except HTTPException:
+        raise
     except Exception as e:
+        deadlines.raise_if_timeout(e)
         print(f"Chat Error: {e}")
         return {"reply": f"Sorry, I encountered an error: {str(e)}"}
@@ -1,12 +1,61 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from database import reminders_collection
+from database import reminders_collection, tasks_collection
+import deadlines
 from auth import get_current_user
+from pagination import PageParams, page_params, fetch_page
+from reminder_scheduler import scheduler
+from sse import sse_event, sse_response
+from fast_json import projection, trusted_list
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timezone
+import ics
+import asyncio
 import uuid
+import re
 
 router = APIRouter()
 
+REMINDERS_SORT = [("date", 1), ("id", 1)]
+DATE_TIME = re.compile(r"(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2}))?")
+MONTH = re.compile(r"\d{4}-\d{2}")
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+DUPLICATE_KEY = 11000
+
+def parse_bound(value: str, name: str):
+    match = DATE_TIME.fullmatch(value)
+    if not match:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be YYYY-MM-DD or YYYY-MM-DDTHH:MM")
+    return match.group(1), match.group(2)
+
+def range_filter(start: Optional[str], end: Optional[str]):
+    """
+    Mongo conditions for reminders between two inclusive bounds. Dates and
+    times are zero-padded strings, so string order is chronological.
+    Reminders without a time count as the start of their day.
+    """
+    conditions = []
+    if start:
+        date, time = parse_bound(start, "from")
+        if time:
+            conditions.append({"$or": [{"date": {"$gt": date}}, {"date": date, "time": {"$gte": time}}]})
+        else:
+            conditions.append({"date": {"$gte": date}})
+    if end:
+        date, time = parse_bound(end, "to")
+        if time:
+            conditions.append({"$or": [
+                {"date": {"$lt": date}},
+                {"date": date, "time": {"$lte": time}},
+                {"date": date, "time": None},
+            ]})
+        else:
+            conditions.append({"date": {"$lte": date}})
+    return conditions
+
 class Reminder(BaseModel):
     id: str
     date: str # YYYY-MM-DD
@@ -20,15 +69,48 @@ class CreateReminder(BaseModel):
     text: str
 
 @router.get("/reminders", response_model=List[Reminder])
-async def get_reminders():
+async def get_reminders(
+    response: Response,
+    page: PageParams = Depends(page_params(100)),
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to")
+):
     # user: dict = Depends(get_current_user)
     try:
-        cursor = reminders_collection.find({"teacher_email": "demo_teacher@school.com"})
-        items = await cursor.to_list(length=100)
-        return items
+        query = {"teacher_email": "demo_teacher@school.com"}
+        conditions = range_filter(start, end)
+        if conditions:
+            query = {"$and": [query, *conditions]}
+        items, _ = await fetch_page(
+            reminders_collection, query, REMINDERS_SORT, page, response, projection=projection(Reminder)
+        )
+        return trusted_list(Reminder, items, response)
+    except HTTPException:
+        raise
     except Exception as e:
+        deadlines.raise_if_timeout(e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/reminders/summary")
+async def get_month_summary(month: str = Query(..., description="YYYY-MM")):
+    # user: dict = Depends(get_current_user)
+    if not MONTH.fullmatch(month):
+        raise HTTPException(status_code=400, detail="'month' must be YYYY-MM")
+    pipeline = [
+        {"$match": {
+            "teacher_email": "demo_teacher@school.com",
+            "date": {"$gte": f"{month}-01", "$lte": f"{month}-31"}
+        }},
+        {"$group": {"_id": "$date", "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]
+    try:
+        days = {row["_id"]: row["count"] async for row in reminders_collection.aggregate(pipeline)}
+    except Exception as e:
+        deadlines.raise_if_timeout(e)
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"month": month, "days": days, "total": sum(days.values())}
+
 @router.post("/reminders", response_model=Reminder)
 async def add_reminder(data: CreateReminder):
     # user: dict = Depends(get_current_user)
@@ -42,8 +124,10 @@ async def add_reminder(data: CreateReminder):
         }
         await reminders_collection.insert_one(new_item)
         if "_id" in new_item: del new_item["_id"]
+        scheduler.schedule(new_item)
         return new_item
     except Exception as e:
+        deadlines.raise_if_timeout(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/reminders/{reminder_id}")
@@ -52,4 +136,140 @@ async def delete_reminder(reminder_id: str):
     result = await reminders_collection.delete_one({"id": reminder_id, "teacher_email": "demo_teacher@school.com"})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Reminder not found")
+    scheduler.cancel(reminder_id)
     return {"message": "Deleted"}
+
+async def reminder_events(request: Request, teacher_email: str):
+    queue = scheduler.subscribe(teacher_email)
+    try:
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            try:
+                reminder = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"  # keeps proxies from closing an idle stream
+                continue
+            yield sse_event(reminder, event="reminder")
+    finally:
+        scheduler.unsubscribe(teacher_email, queue)
+
+@router.get("/reminders/stream")
+async def stream_reminders(request: Request):
+    # user: dict = Depends(get_current_user)
+    # Due reminders are pushed as "reminder" events, replacing client polling
+    return sse_response(reminder_events(request, "demo_teacher@school.com"))
+
+# --- iCalendar import / export ---
+# Timed events become reminders, all-day events (school holidays and the
+# like) become tasks. Both keep the event UID, which a unique index uses to
+# make re-importing the same calendar a no-op.
+
+async def insert_batch(collection, docs):
+    """insert_many that tolerates duplicate UIDs; returns (inserted docs, duplicates)."""
+    if not docs:
+        return [], 0
+    try:
+        await collection.insert_many(docs, ordered=False)
+        return docs, 0
+    except BulkWriteError as e:
+        failed = {}
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error.get("code")
+        others = [code for code in failed.values() if code != DUPLICATE_KEY]
+        if others:
+            print(f"ICS Import Error: {len(others)} events failed to insert")
+        inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+        return inserted, len(failed) - len(others)
+
+@router.post("/import")
+async def import_calendar(file: UploadFile = File(...)):
+    # user: dict = Depends(get_current_user)
+    teacher_email = "demo_teacher@school.com"
+    counts = {"reminders": 0, "tasks": 0, "duplicates": 0, "recurring": 0, "skipped": 0}
+    reminders, tasks = [], []
+
+    async def flush_reminders():
+        inserted, duplicates = await insert_batch(reminders_collection, reminders)
+        for doc in inserted:
+            doc.pop("_id", None)
+            scheduler.schedule(doc)
+        counts["reminders"] += len(inserted)
+        counts["duplicates"] += duplicates
+        reminders.clear()
+
+    async def flush_tasks():
+        inserted, duplicates = await insert_batch(tasks_collection, tasks)
+        counts["tasks"] += len(inserted)
+        counts["duplicates"] += duplicates
+        tasks.clear()
+
+    try:
+        async for event in ics.parse_events(ics.read_lines(file)):
+            if event["recurring"]:
+                counts["recurring"] += 1
+                continue
+            if event["start"] is None or not event["summary"]:
+                counts["skipped"] += 1
+                continue
+            uid = event["uid"] or uuid.uuid4().hex
+            if event["time"]:
+                reminders.append({
+                    "id": uuid.uuid4().hex,
+                    "uid": uid,
+                    "date": event["start"].isoformat(),
+                    "time": event["time"],
+                    "text": event["summary"],
+                    "teacher_email": teacher_email
+                })
+            else:
+                days = ics.event_days(event)
+                for day in days:
+                    tasks.append({
+                        "id": uuid.uuid4().hex,
+                        # one task per day, each with its own dedupe key
+                        "uid": uid if len(days) == 1 else f"{uid}/{day.isoformat()}",
+                        "title": event["summary"],
+                        "date": day.isoformat(),
+                        "type": "holiday"
+                    })
+            if len(reminders) >= IMPORT_BATCH_SIZE:
+                await flush_reminders()
+            if len(tasks) >= IMPORT_BATCH_SIZE:
+                await flush_tasks()
+        await flush_reminders()
+        await flush_tasks()
+    except Exception as e:
+        deadlines.raise_if_timeout(e)
+        raise HTTPException(status_code=500, detail=f"ICS Import Error: {str(e)}")
+    return counts
+
+async def calendar_lines(teacher_email: str):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield ics.calendar_header("Assist AI")
+    reminders = reminders_collection.find(
+        {"teacher_email": teacher_email}, {"_id": 0, "id": 1, "uid": 1, "date": 1, "time": 1, "text": 1}
+    ).sort(REMINDERS_SORT).batch_size(EXPORT_BATCH_SIZE)
+    async for item in reminders:
+        try:
+            yield ics.format_event(item.get("uid") or f"{item['id']}@assist-ai", item.get("text", ""), item["date"], item.get("time"), stamp)
+        except (KeyError, ValueError):
+            continue  # malformed stored date
+    tasks = tasks_collection.find(
+        {}, {"_id": 0, "id": 1, "uid": 1, "date": 1, "title": 1}
+    ).sort([("date", 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    async for item in tasks:
+        try:
+            yield ics.format_event(item.get("uid") or f"{item['id']}@assist-ai", item.get("title", ""), item["date"], None, stamp)
+        except (KeyError, ValueError):
+            continue
+    yield ics.calendar_footer()
+
+@router.get("/export.ics")
+async def export_calendar():
+    # user: dict = Depends(get_current_user)
+    # Written straight from the cursors, one batch in memory at a time
+    return StreamingResponse(
+        calendar_lines("demo_teacher@school.com"),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="assist-ai.ics"'}
+    )
@@ -1,14 +1,28 @@
 
-from fastapi import APIRouter, HTTPException, Form, Depends
+from fastapi import APIRouter, HTTPException, Form, Depends, Response, Request, Query
 from pydantic import BaseModel
 from typing import List, Optional
-from database import notes_collection, tasks_collection, subjects_collection
+from database import notes_collection, tasks_collection, subjects_collection, reminders_collection
+import deadlines
 from auth import get_current_user
+from pagination import PageParams, page_params, fetch_page
+from routers.calendar import REMINDERS_SORT
+from versions import conditional, bump, etag_matches
+from fast_json import projection, trusted_list
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import asyncio
+import hashlib
+import json
 import uuid
 
 router = APIRouter()
 
+NOTES_SORT = [("date", -1), ("id", -1)]
+TASKS_SORT = [("date", 1), ("id", 1)]
+SUBJECTS_SORT = [("id", 1)]
+
 # Models
 class Note(BaseModel):
     id: str
@@ -33,24 +47,87 @@ class Subject(CreateSubject):
     completed_chapters: List[int] = []
     teacher_email: Optional[str] = None
 
+class ChapterChanges(BaseModel):
+    subject_id: str
+    mark: List[int] = []
+    unmark: List[int] = []
+
+class BulkProgressRequest(BaseModel):
+    updates: List[ChapterChanges]
+
+# --- Summary ---
+# section -> (collection, sort, first-page size); sizes match the list endpoints
+SUMMARY_SECTIONS = {
+    "notes": (notes_collection, NOTES_SORT, 20),
+    "tasks": (tasks_collection, TASKS_SORT, 100),
+    "subjects": (subjects_collection, SUBJECTS_SORT, 50),
+    "reminders": (reminders_collection, REMINDERS_SORT, 100),
+}
+
+@router.get("/summary")
+async def get_summary(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated sections, e.g. notes,tasks"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    First page of every dashboard list in one round trip. The queries run
+    concurrently; `cursors` holds each section's next-page cursor for the
+    list endpoints. The ETag covers the whole body.
+    """
+    sections = list(SUMMARY_SECTIONS)
+    if fields:
+        sections = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in sections if f not in SUMMARY_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    queries = {
+        "notes": {},
+        "tasks": {},
+        "subjects": {"teacher_email": user["email"]},
+        "reminders": {"teacher_email": "demo_teacher@school.com"},
+    }
+    try:
+        pages = await asyncio.gather(*[
+            fetch_page(
+                SUMMARY_SECTIONS[name][0], queries[name], SUMMARY_SECTIONS[name][1],
+                PageParams(SUMMARY_SECTIONS[name][2], None), projection={"_id": 0}
+            )
+            for name in sections
+        ])
+    except Exception as e:
+        deadlines.raise_if_timeout(e)
+        raise HTTPException(status_code=500, detail=f"Summary Error: {str(e)}")
+
+    payload = {name: items for name, (items, _) in zip(sections, pages)}
+    payload["cursors"] = {name: cursor for name, (_, cursor) in zip(sections, pages) if cursor}
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    headers = {
+        "ETag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(headers["ETag"], request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # --- Notes ---
-@router.get("/notes", response_model=List[Note])
-async def get_notes():
-    cursor = notes_collection.find().sort("date", -1).limit(20)
-    notes = await cursor.to_list(length=20)
-    return notes
+@router.get("/notes", response_model=List[Note], dependencies=[Depends(conditional("notes"))])
+async def get_notes(response: Response, page: PageParams = Depends(page_params(20))):
+    notes, _ = await fetch_page(notes_collection, {}, NOTES_SORT, page, response, projection=projection(Note))
+    return trusted_list(Note, notes, response)
 
 @router.post("/notes")
 async def add_note(note: Note):
     # If ID not provided, generate? Frontend sends ID based on Date.now() usually
     await notes_collection.insert_one(note.model_dump())
+    await bump("notes")
     return {"message": "Note added"}
 
 # --- Tasks ---
 @router.get("/tasks")
-async def get_tasks():
-    cursor = tasks_collection.find()
-    tasks = await cursor.to_list(length=100)
+async def get_tasks(response: Response, page: PageParams = Depends(page_params(100))):
+    tasks, _ = await fetch_page(tasks_collection, {}, TASKS_SORT, page, response, projection={"_id": 0})
     # Return as list, frontend maps by date
     return tasks
 
@@ -60,14 +137,23 @@ async def add_task(task: Task):
     return {"message": "Task added"}
 
 # --- Subjects ---
-@router.get("/subjects", response_model=List[Subject])
-async def get_subjects(user: dict = Depends(get_current_user)):
+@router.get("/subjects", response_model=List[Subject], dependencies=[Depends(conditional("subjects"))])
+async def get_subjects(
+    response: Response,
+    page: PageParams = Depends(page_params(50)),
+    user: dict = Depends(get_current_user)
+):
     try:
-        # Filter by teacher_email
-        cursor = subjects_collection.find({"teacher_email": user["email"]})
-        subs = await cursor.to_list(length=50)
-        return subs
+        # Filter by teacher_email; subjects have no date, so they page on id alone
+        subs, _ = await fetch_page(
+            subjects_collection, {"teacher_email": user["email"]}, SUBJECTS_SORT, page, response,
+            projection=projection(Subject)
+        )
+        return trusted_list(Subject, subs, response)
+    except HTTPException:
+        raise
     except Exception as e:
+        deadlines.raise_if_timeout(e)
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Get Subjects Error: {str(e)}")
@@ -80,9 +166,11 @@ async def add_subject(sub: CreateSubject, user: dict = Depends(get_current_user)
         new_sub["completed_chapters"] = []
         new_sub["teacher_email"] = user["email"]
         await subjects_collection.insert_one(new_sub)
+        await bump("subjects")
         
         return new_sub
     except Exception as e:
+        deadlines.raise_if_timeout(e)
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Add Subject Error: {str(e)}")
@@ -93,10 +181,112 @@ async def delete_subject(sub_id: str, user: dict = Depends(get_current_user)):
         result = await subjects_collection.delete_one({"id": sub_id, "teacher_email": user["email"]})
         if result.deleted_count == 0:
              raise HTTPException(status_code=404, detail="Subject not found or not authorized")
+        await bump("subjects")
         return {"message": "Subject deleted"}
     except Exception as e:
+        deadlines.raise_if_timeout(e)
         raise HTTPException(status_code=500, detail=f"Delete Subject Error: {str(e)}")
 
+@router.post("/subjects/progress/bulk")
+async def bulk_update_progress(payload: BulkProgressRequest, user: dict = Depends(get_current_user)):
+    """
+    Apply chapter changes for many subjects in one bulk_write. Items for the
+    same subject apply in request order, so queued ticks "mark 3" then
+    "unmark 3" leave chapter 3 unmarked. Each subject's changes are merged
+    into one $addToSet and one $pull over disjoint chapters; those commute,
+    which lets the batch run unordered. Results are reported per item, and
+    an item that would not change its subject is "unchanged".
+    """
+    # Subjects as they are now, to tell which items change anything
+    ids = list({item.subject_id for item in payload.updates})
+    completed = {
+        doc["id"]: set(doc.get("completed_chapters", []))
+        async for doc in subjects_collection.find(
+            {"id": {"$in": ids}, "teacher_email": user["email"]}, {"id": 1, "completed_chapters": 1}
+        )
+    }
+    statuses = {}
+    details = {}
+    wanted = {}  # subject_id -> {chapter: completed?}, last item wins
+    for index, item in enumerate(payload.updates):
+        mark, unmark = set(item.mark), set(item.unmark)
+        if mark & unmark:
+            statuses[index] = "error"
+            details[index] = "A chapter cannot be both marked and unmarked"
+            continue
+        if item.subject_id not in completed:
+            statuses[index] = "not_found"
+            continue
+        chapters = completed[item.subject_id]
+        statuses[index] = "updated" if (mark - chapters) or (unmark & chapters) else "unchanged"
+        chapters |= mark
+        chapters -= unmark
+        subject = wanted.setdefault(item.subject_id, {})
+        subject.update(dict.fromkeys(mark, True))
+        subject.update(dict.fromkeys(unmark, False))
+
+    # A subject none of whose items change anything needs no write
+    changed = {item.subject_id for index, item in enumerate(payload.updates) if statuses[index] == "updated"}
+    ops, op_subjects = [], []
+    for subject_id, chapters in wanted.items():
+        if subject_id not in changed:
+            continue
+        query = {"id": subject_id, "teacher_email": user["email"]}
+        add = [chapter for chapter, done in chapters.items() if done]
+        remove = [chapter for chapter, done in chapters.items() if not done]
+        if add:
+            ops.append(UpdateOne(query, {"$addToSet": {"completed_chapters": {"$each": add}}}))
+            op_subjects.append(subject_id)
+        if remove:
+            ops.append(UpdateOne(query, {"$pull": {"completed_chapters": {"$in": remove}}}))
+            op_subjects.append(subject_id)
+    if ops:
+        failed = {}
+        try:
+            modified = (await subjects_collection.bulk_write(ops, ordered=False)).modified_count
+        except BulkWriteError as e:
+            modified = e.details.get("nModified", 0)
+            for error in e.details.get("writeErrors", []):
+                failed[op_subjects[error["index"]]] = error.get("errmsg", "write error")
+        for index, item in enumerate(payload.updates):
+            if item.subject_id in failed and statuses[index] in ("updated", "unchanged"):
+                statuses[index] = "error"
+                details[index] = failed[item.subject_id]
+        if modified:
+            await bump("subjects")
+
+    results = []
+    for index, item in enumerate(payload.updates):
+        result = {"subject_id": item.subject_id, "status": statuses[index]}
+        if index in details:
+            result["detail"] = details[index]
+        results.append(result)
+    return {"results": results}
+
+@router.put("/subjects/{sub_id}/chapters/{chapter}")
+async def mark_chapter(sub_id: str, chapter: int, user: dict = Depends(get_current_user)):
+    result = await subjects_collection.update_one(
+        {"id": sub_id, "teacher_email": user["email"]},
+        {"$addToSet": {"completed_chapters": chapter}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Subject not found or not authorized")
+    if result.modified_count:
+        await bump("subjects")
+    return {"message": "Chapter marked", "changed": result.modified_count > 0}
+
+@router.delete("/subjects/{sub_id}/chapters/{chapter}")
+async def unmark_chapter(sub_id: str, chapter: int, user: dict = Depends(get_current_user)):
+    result = await subjects_collection.update_one(
+        {"id": sub_id, "teacher_email": user["email"]},
+        {"$pull": {"completed_chapters": chapter}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Subject not found or not authorized")
+    if result.modified_count:
+        await bump("subjects")
+    return {"message": "Chapter unmarked", "changed": result.modified_count > 0}
+
 @router.post("/subjects/{sub_id}/progress")
 async def update_progress(sub_id: str, completed_chapters: List[int], user: dict = Depends(get_current_user)):
     # Add user check to ensure ownership
@@ -106,4 +296,5 @@ async def update_progress(sub_id: str, completed_chapters: List[int], user: dict
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Subject not found or not authorized")
+    await bump("subjects")
     return {"message": "Progress updated"}
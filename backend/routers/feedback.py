@@ -1,16 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Response, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from database import feedback_collection
+import deadlines
 from auth import get_current_user
+from pagination import PageParams, page_params, fetch_page
+from versions import conditional, bump
+from fast_json import projection, trusted_list
+from jobs import job_queue, public, FINISHED, JOB_POLL_SECONDS
+from sse import sse_event, sse_response
+import hashlib
 import uuid
 from datetime import datetime
 
 router = APIRouter()
 
-from google import genai
+FEEDBACK_SORT = [("date", -1), ("id", -1)]
+
 from google.genai import types
-import os
+from ai_executor import generate_content, gemini_retryable
+from admission import BACKGROUND
+from ai_clients import AIClients, get_ai_clients
+from lang_detect import LANG_NAMES, resolve_language
 import json
 
 class FeedbackResponse(BaseModel):
@@ -32,40 +43,25 @@ class FeedbackItem(BaseModel):
 class RateFeedbackRequest(BaseModel):
     successful: bool
 
-@router.get("/list", response_model=List[FeedbackItem])
-async def get_feedback():
+@router.get("/list", response_model=List[FeedbackItem], dependencies=[Depends(conditional("feedback"))])
+async def get_feedback(response: Response, page: PageParams = Depends(page_params(50))):
     # user: dict = Depends(get_current_user) # Removed for demo consistency
-    cursor = feedback_collection.find({"teacher_email": "demo_teacher@school.com"}).sort("date", -1)
-    items = await cursor.to_list(length=50)
-    return items
+    items, _ = await fetch_page(
+        feedback_collection, {"teacher_email": "demo_teacher@school.com"}, FEEDBACK_SORT, page, response,
+        projection=projection(FeedbackItem)
+    )
+    return trusted_list(FeedbackItem, items, response)
 
-@router.post("/analyze")
-async def analyze_feedback(
-    message: str = Form(...),
-    language: str = Form("en"),
-    feedback_id: Optional[str] = Form(None)
-):
-    GEMINI_KEY = os.getenv("GEMINI_API_KEY")
-    client = None
-    if GEMINI_KEY:
-        try:
-            client = genai.Client(api_key=GEMINI_KEY)
-        except Exception as e:
-            print(f"Gemini Client Init Error: {e}")
-            raise HTTPException(status_code=500, detail="AI Service Config Error")
-    else:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY missing")
-
-    # Prompt Engineering
-    if feedback_id:
+def analysis_prompt(message: str, lang_name: str, retry: bool):
+    if retry:
         # RETRY MODE: Concise Bullet Points
-        PROMPT = f"""
+        return f"""
         You are an expert teacher mentor. This is a RE-ANALYSIS for a teacher who needed more clarity.
         
         Teacher Input:
         "{message}"
         
-        Language: {language}
+        Language: {lang_name}
         
         Task:
         1. good_things: List 4-5 BRIEF bullet points of good things.
@@ -82,17 +78,16 @@ async def analyze_feedback(
         - bad_things
         - improvement
         
-        IMPORTANT: The content of the values MUST be in the requested language ({language}).
+        IMPORTANT: The content of the values MUST be in the requested language ({lang_name}).
         """
-    else:
-        # INITIAL MODE: Standard Analysis (Short Paragraphs)
-        PROMPT = f"""
+    # INITIAL MODE: Standard Analysis (Short Paragraphs)
+    return f"""
         You are an expert teacher mentor. Analyze the following teacher's reflection/input properly.
         
         Teacher Input:
         "{message}"
         
-        Language: {language}
+        Language: {lang_name}
         
         Task:
         1. good_things: Analyze the good things the teacher did. (Short paragraph).
@@ -104,16 +99,31 @@ async def analyze_feedback(
         - bad_things
         - improvement
         
-        IMPORTANT: The content of the values MUST be in the requested language ({language}).
+        IMPORTANT: The content of the values MUST be in the requested language ({lang_name}).
         """
+
+async def run_analysis(clients: AIClients, message: str, language: str, feedback_id: Optional[str] = None, item_id: Optional[str] = None):
+    """
+    Analyze a reflection and store it: a new feedback item (with id
+    `item_id`, so a retried job overwrites its own earlier attempt), or a
+    re-analysis of `feedback_id`. Returns the stored item.
+    """
+    client = clients.gemini
+    if not client:
+        raise RuntimeError(clients.gemini_error or "AI Service Config Error")
+
+    language = resolve_language(language, message)
+    lang_name = LANG_NAMES[language]
+    PROMPT = analysis_prompt(message, lang_name, retry=bool(feedback_id))
     
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=PROMPT,
+        response = await generate_content(
+            client,
+            PROMPT,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            priority=BACKGROUND
         )
         generated_text = response.text.strip()
         # Clean markdown code blocks if present
@@ -122,7 +132,11 @@ async def analyze_feedback(
         
         analysis_data = json.loads(generated_text)
         
+    except HTTPException:
+        raise  # overloaded: let the job be retried rather than store canned text
     except Exception as e:
+        if gemini_retryable(e):
+            raise  # retries exhausted on a transient error: the job tries again later
         print(f"AI Generation Error: {e}")
         # Fallback for error handling
         analysis_data = {
@@ -140,16 +154,15 @@ async def analyze_feedback(
             {"id": feedback_id, "teacher_email": "demo_teacher@school.com"},
             {"$set": {"analysis": analysis_data, "date": datetime.now().strftime("%Y-%m-%d")}}
         )
+        await bump("feedback")
         # Fetch updated item to return
-        updated_item = await feedback_collection.find_one({"id": feedback_id})
-        if updated_item:
-            if "_id" in updated_item: del updated_item["_id"]
-            return updated_item
-        else:
-             raise HTTPException(status_code=404, detail="Feedback ID not found for update")
+        updated_item = await feedback_collection.find_one({"id": feedback_id}, {"_id": 0})
+        if not updated_item:
+            raise LookupError("Feedback ID not found for update")
+        return updated_item
 
     # Create and Save Record
-    new_id = uuid.uuid4().hex
+    new_id = item_id or uuid.uuid4().hex
     new_item = {
         "id": new_id,
         "date": datetime.now().strftime("%Y-%m-%d"),
@@ -162,11 +175,82 @@ async def analyze_feedback(
         "teacher_email": "demo_teacher@school.com" 
     }
     
-    await feedback_collection.insert_one(new_item)
+    await feedback_collection.replace_one({"id": new_id}, new_item, upsert=True)
     if "_id" in new_item: del new_item["_id"]
+    await bump("feedback")
     
     return new_item
 
+async def analysis_job(payload: dict, job_id: str, app):
+    return await run_analysis(
+        app.state.ai_clients, payload["message"], payload["language"], payload.get("feedback_id"), item_id=job_id
+    )
+
+job_queue.register("feedback_analysis", analysis_job)
+
+def analysis_key(message: str, language: str, feedback_id: Optional[str]):
+    # Re-sending the same reflection (client timeout, double submit) maps to the same job
+    digest = hashlib.sha256(message.strip().encode("utf-8")).hexdigest()
+    return f"feedback_analysis:{feedback_id or 'new'}:{language}:{digest}"
+
+@router.post("/analyze", status_code=202)
+async def analyze_feedback(
+    response: Response,
+    message: str = Form(...),
+    language: str = Form("en"),
+    feedback_id: Optional[str] = Form(None),
+    clients: AIClients = Depends(get_ai_clients)
+):
+    """
+    Queue an analysis and return its job at once. The finished job's
+    `result` is the stored feedback item; follow it with GET /jobs/{id}
+    or the SSE stream at /jobs/{id}/stream.
+    """
+    if not clients.gemini:
+        if clients.gemini_error == "GEMINI_API_KEY missing":
+            raise HTTPException(status_code=500, detail="GEMINI_API_KEY missing")
+        raise HTTPException(status_code=500, detail="AI Service Config Error")
+    if feedback_id and not await feedback_collection.find_one(
+        {"id": feedback_id, "teacher_email": "demo_teacher@school.com"}, {"_id": 1}
+    ):
+        raise HTTPException(status_code=404, detail="Feedback ID not found for update")
+
+    payload = {"message": message, "language": language, "feedback_id": feedback_id}
+    try:
+        job = await job_queue.enqueue("feedback_analysis", payload, analysis_key(message, language, feedback_id))
+    except Exception as e:
+        deadlines.raise_if_timeout(e)
+        raise HTTPException(status_code=500, detail=f"Job Queue Error: {str(e)}")
+    response.headers["Location"] = f"/api/feedback/jobs/{job['_id']}"
+    return public(job)
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public(job)
+
+async def job_events(request: Request, job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        yield sse_event({"job_id": job_id, "status": "missing"}, event="status")
+        return
+    yield sse_event(public(job), event="status")
+    status = job["status"]
+    while status not in FINISHED and not await request.is_disconnected():
+        job = await job_queue.wait(job_id, JOB_POLL_SECONDS)
+        if job and job["status"] != status:
+            status = job["status"]
+            yield sse_event(public(job), event="status")
+        elif not job:
+            break
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_analysis_job(job_id: str, request: Request):
+    # One "status" event per change; the stream ends once the job is done or failed
+    return sse_response(job_events(request, job_id))
+
 @router.patch("/{id}/rate")
 async def rate_feedback(id: str, payload: RateFeedbackRequest):
     result = await feedback_collection.update_one(
@@ -175,4 +259,5 @@ async def rate_feedback(id: str, payload: RateFeedbackRequest):
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Feedback not found")
+    await bump("feedback")
     return {"message": "Rating saved"}
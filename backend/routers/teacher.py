@@ -1,13 +1,76 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Body
-from models import TeacherModel, Token
+from fastapi import APIRouter, HTTPException, status, Depends, Body, UploadFile, File, Request, Response
+from models import TeacherModel, TeacherProfile, Token
 from database import teacher_collection
-from auth import get_password_hash, verify_password, create_access_token, get_current_user
+from auth import get_password_hash_async, verify_password_async, create_access_token, get_current_user
 from datetime import timedelta
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from pymongo import ReturnDocument
+from cache import build_cache
+from blobstore import blob_store
+from image_pipeline import read_upload, downscale_async, PROFILE_PICTURE_MAX_BYTES
+from versions import etag_for, etag_matches, validate
+import base64
+import hashlib
+import os
+import re
 
 router = APIRouter()
 
+# Per-teacher profile cache. Use PROFILE_CACHE_BACKEND=mongo to share it
+# between workers so an update on one is seen by all of them.
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", 300))
+profile_cache = build_cache(
+    "teacher_profiles",
+    os.getenv("PROFILE_CACHE_BACKEND"),
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", 1024)),
+    ttl=PROFILE_CACHE_TTL
+)
+
+# The password hash never leaves the teachers collection on the profile path:
+# it is projected out of every read, so it cannot reach the profile cache
+# (a second, shorter-lived copy when PROFILE_CACHE_BACKEND=mongo) or a client
+PROFILE_PROJECTION = {"password_hash": 0}
+
+async def cache_profile(teacher: dict):
+    # The document's own profile_version travels with the cached copy, so
+    # the ETag always describes the body it is sent with
+    teacher["_id"] = str(teacher["_id"])
+    teacher.pop("password_hash", None)
+    entry = {"version": teacher.pop("profile_version", 0), "profile": teacher}
+    await profile_cache.set(teacher["email"], entry)
+    return entry
+
+# Profile pictures live in the blob store, not in the teacher document; the
+# document only keeps the URL of the picture endpoint.
+PROFILE_PICTURE_EDGE = int(os.getenv("PROFILE_PICTURE_EDGE", 512))
+PROFILE_THUMB_EDGE = int(os.getenv("PROFILE_THUMB_EDGE", 128))
+PICTURE_ID = re.compile(r"[0-9a-f]{32}")
+
+async def store_profile_picture(data: bytes):
+    if len(data) > PROFILE_PICTURE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Profile picture too large")
+    try:
+        full = await downscale_async(data, PROFILE_PICTURE_EDGE)
+        thumb = await downscale_async(full, PROFILE_THUMB_EDGE)
+    except Exception as e:
+        print(f"Profile picture error: {e}")
+        raise HTTPException(status_code=400, detail="Invalid image")
+    picture_id = hashlib.sha256(full).hexdigest()[:32]
+    await blob_store.put(picture_id, full, "image/jpeg")
+    await blob_store.put(f"{picture_id}-thumb", thumb, "image/jpeg")
+    return f"/api/teacher/picture/{picture_id}"
+
+async def externalize_picture(value: Optional[str]):
+    """Move an inline base64 data URL into the blob store; other values pass through."""
+    if not value or not value.startswith("data:"):
+        return value
+    try:
+        data = base64.b64decode(value.split(",", 1)[1])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    return await store_profile_picture(data)
+
 class TeacherRegisterSchema(BaseModel):
     name: str
     email: EmailStr
@@ -24,47 +87,108 @@ class TeacherProfileUpdateSchema(BaseModel):
     name: str
     profile_picture: Optional[str] = None
 
-@router.get("/profile", response_model=TeacherModel)
-async def get_profile(current_user: dict = Depends(get_current_user)):
-    teacher = await teacher_collection.find_one({"email": current_user["email"]})
+def profile_etag(entry, request: Request):
+    # Per teacher: one teacher's update leaves everyone else's tag alone
+    return etag_for(f"teachers:{entry['profile']['email']}", entry["version"], request)
+
+async def load_profile(email):
+    teacher = await teacher_collection.find_one({"email": email}, PROFILE_PROJECTION)
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
-    return teacher
+    # Migrate pictures saved inline before the blob store existed
+    picture = teacher.get("profile_picture")
+    if picture and picture.startswith("data:"):
+        try:
+            migrated = await teacher_collection.find_one_and_update(
+                {"email": email},
+                {"$set": {"profile_picture": await externalize_picture(picture)}, "$inc": {"profile_version": 1}},
+                projection=PROFILE_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+            teacher = migrated or teacher
+        except Exception as e:
+            print(f"Profile picture migration failed: {e}")
+    return await cache_profile(teacher)
+
+@router.get("/profile", response_model=TeacherProfile)
+async def get_profile(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    # A cache hit costs no round trip; the tag comes from the cached entry,
+    # so an update made through another worker shows up once it expires
+    entry = await profile_cache.get(current_user["email"])
+    if entry is None or "profile" not in entry:  # missing, or cached in an older shape
+        entry = await load_profile(current_user["email"])
+    validate(profile_etag(entry, request), request, response)
+    return entry["profile"]
 
-@router.put("/profile", response_model=TeacherModel)
+@router.put("/profile", response_model=TeacherProfile)
 async def update_profile(
     update_data: TeacherProfileUpdateSchema,
     current_user: dict = Depends(get_current_user)
 ):
-    teacher = await teacher_collection.find_one({"email": current_user["email"]})
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found")
-    
     update_fields = {
         "name": update_data.name,
-        "profile_picture": update_data.profile_picture
+        "profile_picture": await externalize_picture(update_data.profile_picture)
     }
     
     # Only update fields that are provided
     update_fields = {k: v for k, v in update_fields.items() if v is not None}
 
-    await teacher_collection.update_one(
+    # Single round trip: update and get the new document back atomically
+    updated_teacher = await teacher_collection.find_one_and_update(
         {"email": current_user["email"]},
-        {"$set": update_fields}
+        {"$set": update_fields, "$inc": {"profile_version": 1}},
+        projection=PROFILE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    
-    updated_teacher = await teacher_collection.find_one({"email": current_user["email"]})
-    return updated_teacher
+    if not updated_teacher:
+        await profile_cache.delete(current_user["email"])
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    return (await cache_profile(updated_teacher))["profile"]
+
+@router.put("/profile/picture", response_model=TeacherProfile)
+async def upload_profile_picture(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    data = await read_upload(file, PROFILE_PICTURE_MAX_BYTES)
+    picture_url = await store_profile_picture(data)
+    updated_teacher = await teacher_collection.find_one_and_update(
+        {"email": current_user["email"]},
+        {"$set": {"profile_picture": picture_url}, "$inc": {"profile_version": 1}},
+        projection=PROFILE_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_teacher:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    return (await cache_profile(updated_teacher))["profile"]
+
+@router.get("/picture/{picture_id}")
+async def get_picture(picture_id: str, request: Request, size: str = "full"):
+    if not PICTURE_ID.fullmatch(picture_id):
+        raise HTTPException(status_code=404, detail="Picture not found")
+    name = f"{picture_id}-thumb" if size == "thumb" else picture_id
+    # Picture ids are content hashes, so a given URL never changes
+    headers = {
+        "ETag": f'"{name}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if etag_matches(headers["ETag"], request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    blob = await blob_store.get(name)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Picture not found")
+    data, content_type = blob
+    return Response(content=data, media_type=content_type, headers=headers)
 
 @router.post("/register", response_model=Token)
 async def register_teacher(teacher: TeacherRegisterSchema):
     # Check if teacher exists
-    existing_teacher = await teacher_collection.find_one({"email": teacher.email})
+    existing_teacher = await teacher_collection.find_one({"email": teacher.email}, {"_id": 1})
     if existing_teacher:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Hash password
-    hashed_password = get_password_hash(teacher.password)
+    hashed_password = await get_password_hash_async(teacher.password)
     
     # Create teacher document
     new_teacher = TeacherModel(
@@ -88,7 +212,7 @@ async def register_teacher(teacher: TeacherRegisterSchema):
 
 @router.post("/login", response_model=Token)
 async def login_teacher(credentials: TeacherLoginSchema):
-    teacher = await teacher_collection.find_one({"email": credentials.email})
+    teacher = await teacher_collection.find_one({"email": credentials.email}, {"profile_picture": 0})
     if not teacher:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -96,7 +220,7 @@ async def login_teacher(credentials: TeacherLoginSchema):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(credentials.password, teacher["password_hash"]):
+    if not await verify_password_async(credentials.password, teacher["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -0,0 +1,60 @@
+import asyncio
+import deadlines
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one. The first caller
+    (the leader) starts the call as its own task; callers arriving while it
+    runs await that task and get the same result or exception.
+
+    The call does not belong to any one caller: a caller that is cancelled
+    (its HTTP client went away) or runs out of its own deadline only stops
+    waiting. The call runs with no deadline of its own and is cancelled
+    once no caller is left waiting for it.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> [task, waiter count]
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key, func):
+        entry = self._calls.get(key)
+        if entry is None:
+            self.leaders += 1
+            task = deadlines.detached().run(asyncio.ensure_future, func())
+            entry = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await deadlines.within(asyncio.shield(task))
+        except (asyncio.CancelledError, deadlines.DeadlineExceeded):
+            if not task.done() and entry[1] == 1:
+                self.abandoned += 1
+                # Unlisted first so a caller arriving now starts a fresh call
+                if self._calls.get(key) is entry:
+                    del self._calls[key]
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def _forget(self, key, task):
+        entry = self._calls.get(key)
+        if entry is not None and entry[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter has left
+
+    def stats(self):
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import os
+import httpx
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from cache import LRUCache
+import deadlines
+from database import translation_memory_collection
+from resilience import Resilience, UpstreamError
+
+load_dotenv()
+
+# Point HF_API_BASE at a local stand-in (see hf_standin.py) to run the
+# pipeline without touching the real Hugging Face router.
+HF_API_BASE = os.getenv("HF_API_BASE", "https://router.huggingface.co/models")
+HF_TIMEOUT = float(os.getenv("HF_TIMEOUT", 30))
+TRANSLATION_MODEL = "facebook/nllb-200-distilled-600M"
+TRANSLATION_MEMORY_SIZE = int(os.getenv("TRANSLATION_MEMORY_SIZE", 4096))
+
+
+def hf_retryable(error):
+    return isinstance(error, (UpstreamError, httpx.TransportError))
+
+
+# Translations are cheap and idempotent, so a call that outlives the recent
+# p95 gets a hedged duplicate and whichever answers first wins.
+hf_resilience = Resilience(
+    "huggingface",
+    hf_retryable,
+    attempts=int(os.getenv("HF_RETRIES", 3)),
+    base_delay=0.25,
+    hedge=os.getenv("HF_HEDGE", "1") == "1",
+    breaker_threshold=int(os.getenv("HF_BREAKER_THRESHOLD", 5)),
+    breaker_reset=float(os.getenv("HF_BREAKER_RESET", 30)),
+)
+
+
+def memory_key(text, model, src_lang, tgt_lang):
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}|{src_lang}|{tgt_lang}|{digest}"
+
+
+class TranslationMemory:
+    """
+    Translations already paid for, keyed by (text hash, model, src, tgt).
+    A per-worker LRU sits in front of the translation_memory collection;
+    with collection=None only the LRU is used.
+    """
+
+    def __init__(self, collection, maxsize=TRANSLATION_MEMORY_SIZE):
+        self.collection = collection
+        self.local = LRUCache(maxsize=maxsize, ttl=float("inf"))
+
+    async def get_many(self, keys):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing and self.collection is not None:
+            try:
+                async for doc in self.collection.find({"_id": {"$in": missing}}):
+                    found[doc["_id"]] = doc["translation"]
+                    self.local.set(doc["_id"], doc["translation"])
+            except Exception as e:
+                print(f"Translation Memory Read Error: {e}")
+        return found
+
+    async def put_many(self, entries):
+        if not entries:
+            return
+        for key, value in entries.items():
+            self.local.set(key, value)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.bulk_write(
+                [UpdateOne({"_id": k}, {"$set": {"translation": v}}, upsert=True) for k, v in entries.items()],
+                ordered=False
+            )
+        except Exception as e:
+            print(f"Translation Memory Write Error: {e}")
+
+
+translation_memory = TranslationMemory(translation_memory_collection)
+
+
+async def _post(http, model, inputs, src_lang, tgt_lang):
+    payload = {
+        "inputs": inputs,
+        "parameters": {
+            "src_lang": src_lang,
+            "tgt_lang": tgt_lang
+        }
+    }
+
+    async def attempt():
+        deadlines.check()
+        # Never wait on the router past the request's own deadline
+        r = await http.post(f"{HF_API_BASE}/{model}", json=payload, timeout=deadlines.budget(HF_TIMEOUT))
+        # 503 is also how the router says a cold model is still loading
+        if r.status_code == 429 or r.status_code >= 500:
+            raise UpstreamError(r.status_code, r.text[:200])
+        return r.json()
+
+    return await hf_resilience.call(attempt)
+
+
+async def translate_one(http, text, model, src_lang, tgt_lang):
+    """Translate a single string; returns None if the router gave no translation."""
+    try:
+        data = await _post(http, model, text, src_lang, tgt_lang)
+        if isinstance(data, list) and len(data) > 0:
+            return data[0]["translation_text"]
+        elif isinstance(data, dict) and "error" in data:
+            print(f"HF Error: {data['error']}")
+        return None
+    except deadlines.DeadlineExceeded:
+        raise  # the request is over; falling back to the source text helps no one
+    except Exception as e:
+        print(f"Translation Exception: {e}")
+        return None
+
+
+async def translate_batch(http, texts, model, src_lang, tgt_lang):
+    """
+    Translate many strings in one request. If the router does not answer
+    with one translation per input, fall back to concurrent single calls.
+    """
+    if len(texts) == 1:
+        return [await translate_one(http, texts[0], model, src_lang, tgt_lang)]
+    try:
+        data = await _post(http, model, texts, src_lang, tgt_lang)
+        if isinstance(data, list) and len(data) == len(texts):
+            return [item.get("translation_text") if isinstance(item, dict) else None for item in data]
+        if isinstance(data, dict) and "error" in data:
+            print(f"HF Batch Error: {data['error']}")
+    except deadlines.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"Translation Batch Exception: {e}")
+    return await asyncio.gather(*[translate_one(http, t, model, src_lang, tgt_lang) for t in texts])
+
+
+async def translate_texts(http, texts, model, src_lang, tgt_lang):
+    """
+    Translate a list of strings, consulting translation memory first and
+    sending only the misses upstream in a single batch. Failed items come
+    back as their source text.
+    """
+    keys = {text: memory_key(text, model, src_lang, tgt_lang) for text in texts}
+    known = await translation_memory.get_many(list(set(keys.values())))
+
+    pending = [text for text in dict.fromkeys(texts) if keys[text] not in known]
+    if pending:
+        results = await translate_batch(http, pending, model, src_lang, tgt_lang)
+        learned = {keys[text]: out for text, out in zip(pending, results) if out}
+        known.update(learned)
+        await translation_memory.put_many(learned)
+
+    return [known.get(keys[text], text) for text in texts]
+
+
+async def translate(http, text, model, src_lang, tgt_lang):
+    return (await translate_texts(http, [text], model, src_lang, tgt_lang))[0]
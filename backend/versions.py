@@ -0,0 +1,66 @@
+import hashlib
+from fastapi import HTTPException, Request, Response
+from database import DB
+
+# Per-collection change counters backing the ETags of the read endpoints.
+# Every write to a tracked collection bumps its counter, so a read can tell
+# whether the client's copy is current with one primary-key lookup, before
+# running the list query or serializing anything. The counters live in
+# Mongo so every worker process sees the same value.
+versions_collection = DB.versions
+
+
+async def current(name):
+    doc = await versions_collection.find_one({"_id": name}, {"v": 1})
+    return doc["v"] if doc else 0
+
+
+async def bump(name):
+    try:
+        await versions_collection.update_one({"_id": name}, {"$inc": {"v": 1}}, upsert=True)
+    except Exception as e:
+        # A missed bump can serve a stale 304 until the next write
+        print(f"Version Bump Error ({name}): {e}")
+
+
+def etag_for(name, version, request: Request):
+    # Different pages, filters and users of the same collection get different tags
+    key = "|".join([
+        name, str(version), request.url.path, request.url.query,
+        request.headers.get("authorization", ""),
+    ])
+    return f'W/"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def etag_matches(etag, if_none_match):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def validate(etag, request: Request, response: Response):
+    """Answer a matching If-None-Match with 304, otherwise tag the response."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def conditional(name):
+    """
+    Dependency for a GET endpoint reading collection `name`. Answers a
+    matching If-None-Match with 304 before the endpoint body runs, and
+    otherwise tags the response with the current version's ETag.
+    """
+    async def dependency(request: Request, response: Response):
+        try:
+            etag = etag_for(name, await current(name), request)
+        except Exception as e:
+            print(f"Version Lookup Error ({name}): {e}")
+            return  # serve the request untagged rather than fail it
+        validate(etag, request, response)
+    return dependency
@@ -80,20 +80,14 @@ export default function TopNavbar({ onMenuClick }: TopNavbarProps) {
     useEffect(() => {
         const fetchReminders = async () => {
             try {
-                // Ideally this should be a lightweight call or optimized
-                // For now, we fetch all and filter client side.
-                // In production, backend should support ?date=...
-                // But for now, let's use the implementation we have (fetch all)
-                // Note: Cyclic dependency if we import CalendarService directly if it uses something from here? No.
-                // Dynamic import to avoid issues or just standard import.
                 const { CalendarService } = await import("@/services/calendar");
-                const all = await CalendarService.getReminders();
                 // Fix: toISOString returns UTC, which might be "yesterday" if it's early morning local time
                 // Use a proper local YYYY-MM-DD construction
                 const now = new Date();
                 const today = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}-${String(now.getDate()).padStart(2, '0')}`;
 
-                const active = all.filter(r => r.date === today);
+                // Only today's reminders are needed here, so ask the backend for that range
+                const active = await CalendarService.getReminders({ from: today, to: today });
                 setTodayReminders(active);
             } catch (error) {
                 console.error("Failed to fetch notifications", error);
@@ -101,9 +95,15 @@ export default function TopNavbar({ onMenuClick }: TopNavbarProps) {
         };
         fetchReminders();
 
-        // Poll every 1 minute for updates?
-        const interval = setInterval(fetchReminders, 60000);
-        return () => clearInterval(interval);
+        // The backend pushes a "reminder" event when one falls due, so refresh
+        // on push instead of polling. Fall back to polling without EventSource.
+        if (typeof EventSource === 'undefined') {
+            const interval = setInterval(fetchReminders, 60000);
+            return () => clearInterval(interval);
+        }
+        const events = new EventSource('/api/calendar/reminders/stream');
+        events.addEventListener('reminder', fetchReminders);
+        return () => events.close();
     }, []);
 
     const handleLogout = () => {
@@ -36,7 +36,7 @@ export default function SyllabusTracker({ classroomId, initialCompletedChapters,
         } else {
             // Fallback: update directly if no callback provided
             try {
-                await ClassroomService.updateProgress(classroomId, newCompleted);
+                await ClassroomService.setChapter(classroomId, index, !isCompleted);
             } catch (error) {
                 console.error("Failed to save progress", error);
             }
@@ -0,0 +1,25 @@
+// List endpoints return one page at a time; while more rows remain, the
+// cursor for the next page comes back in the X-Next-Cursor header.
+export const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+export const MAX_PAGE_SIZE = 200; // the largest `limit` the API accepts
+
+// Fetches every page of a list endpoint and returns the rows in order.
+// `onError` is called with any non-OK response and is expected to throw.
+export const fetchAllPages = async <T>(
+    url: string,
+    init: RequestInit,
+    onError: (res: Response) => never
+): Promise<T[]> => {
+    const items: T[] = [];
+    const separator = url.includes("?") ? "&" : "?";
+    let cursor: string | null = null;
+    do {
+        const query = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+        const res = await fetch(`${url}${separator}limit=${MAX_PAGE_SIZE}${query}`, init);
+        if (!res.ok) onError(res);
+        const text = await res.text();
+        items.push(...(text ? (JSON.parse(text) as T[]) : []));
+        cursor = res.headers.get(NEXT_CURSOR_HEADER);
+    } while (cursor);
+    return items;
+};
@@ -1,4 +1,6 @@
 
+import { fetchAllPages } from '@/lib/pagination';
+
 export interface Reminder {
     id: string;
     date: string; // YYYY-MM-DD
@@ -11,6 +13,20 @@ export interface CreateReminderDTO {
     text: string;
 }
 
+export interface ImportSummary {
+    reminders: number;
+    tasks: number;
+    duplicates: number;
+    recurring: number; // repeating events, not imported
+    skipped: number;
+}
+
+export interface MonthSummary {
+    month: string; // YYYY-MM
+    days: Record<string, number>; // YYYY-MM-DD -> reminder count
+    total: number;
+}
+
 const API_Base = "/api/calendar";
 
 const getHeaders = () => {
@@ -22,11 +38,22 @@ const getHeaders = () => {
 };
 
 export const CalendarService = {
-    async getReminders(): Promise<Reminder[]> {
-        const res = await fetch(`${API_Base}/reminders`, {
+    // from/to: YYYY-MM-DD or YYYY-MM-DDTHH:MM, both inclusive
+    async getReminders(range?: { from?: string; to?: string }): Promise<Reminder[]> {
+        const params = new URLSearchParams();
+        if (range?.from) params.set("from", range.from);
+        if (range?.to) params.set("to", range.to);
+        const query = params.toString();
+        return fetchAllPages<Reminder>(`${API_Base}/reminders${query ? `?${query}` : ""}`, { headers: getHeaders() }, () => {
+            throw new Error("Failed to fetch reminders");
+        });
+    },
+
+    async getMonthSummary(month: string): Promise<MonthSummary> {
+        const res = await fetch(`${API_Base}/reminders/summary?month=${month}`, {
             headers: getHeaders()
         });
-        if (!res.ok) throw new Error("Failed to fetch reminders");
+        if (!res.ok) throw new Error("Failed to fetch month summary");
         return res.json();
     },
 
@@ -40,6 +67,24 @@ export const CalendarService = {
         return res.json();
     },
 
+    // Imports an .ics file: timed events become reminders, all-day events tasks
+    async importCalendar(file: File): Promise<ImportSummary> {
+        const token = typeof window !== 'undefined' ? localStorage.getItem('token') : '';
+        const form = new FormData();
+        form.append("file", file);
+        const res = await fetch(`${API_Base}/import`, {
+            method: "POST",
+            headers: { "Authorization": `Bearer ${token}` },
+            body: form
+        });
+        if (!res.ok) throw new Error("Failed to import calendar");
+        return res.json();
+    },
+
+    exportUrl(): string {
+        return `${API_Base}/export.ics`;
+    },
+
     async deleteReminder(id: string): Promise<void> {
         const res = await fetch(`${API_Base}/reminders/${id}`, {
             method: "DELETE",
@@ -1,5 +1,6 @@
 
 import { queueRequest, removeRequestByTempId } from '@/lib/offline-sync';
+import { fetchAllPages } from '@/lib/pagination';
 
 export interface Classroom {
     id: string;
@@ -15,6 +16,14 @@ export interface CreateClassroomDTO {
     subject: string;
 }
 
+export interface DashboardSummary {
+    notes?: Record<string, unknown>[];
+    tasks?: Record<string, unknown>[];
+    subjects?: Classroom[];
+    reminders?: Record<string, unknown>[];
+    cursors: Record<string, string>; // section -> next-page cursor
+}
+
 const API_Base = "/api/dashboard"; // Relative path to use proxy
 
 const getHeaders = () => {
@@ -36,17 +45,13 @@ const isOffline = () => {
 export const ClassroomService = {
     async getClassrooms(): Promise<Classroom[]> {
         // GET requests are handled by Service Worker caching (NetworkFirst/StaleWhileRevalidate)
-        const res = await fetch(`${API_Base}/subjects`, {
-            headers: getHeaders()
-        });
-        if (!res.ok) {
-            if (res.status === 401) throw new Error("Unauthorized");
-            throw new Error(`Failed to fetch classrooms: ${res.status} ${res.statusText}`);
-        }
         try {
-            const text = await res.text();
-            return text ? JSON.parse(text) : [];
+            return await fetchAllPages<Classroom>(`${API_Base}/subjects`, { headers: getHeaders() }, (res) => {
+                if (res.status === 401) throw new Error("Unauthorized");
+                throw new Error(`Failed to fetch classrooms: ${res.status} ${res.statusText}`);
+            });
         } catch (error: unknown) {
+            if (!(error instanceof SyntaxError)) throw error;
             console.error("Failed to parse classrooms JSON", error);
             return [];
         }
@@ -139,5 +144,48 @@ export const ClassroomService = {
             }
             throw error;
         }
+    },
+
+    // Mark/unmark a single chapter; concurrent tabs cannot overwrite each other
+    async setChapter(id: string, chapter: number, done: boolean): Promise<void> {
+        const url = `${API_Base}/subjects/${id}/chapters/${chapter}`;
+        const method = done ? "PUT" : "DELETE";
+        const headers = getHeaders();
+
+        try {
+            if (isOffline()) throw new Error("Offline");
+
+            const res = await fetch(url, { method, headers });
+            if (!res.ok) throw new Error("Failed to update chapter");
+        } catch (error: unknown) {
+            const err = error as Error;
+            if (isOffline() || err.message === "Offline" || err.message?.includes("Failed to fetch")) {
+                console.log("Offline mode: Queueing setChapter");
+                await queueRequest(url, method, {}, headers);
+                return;
+            }
+            throw error;
+        }
+    },
+
+    async bulkUpdateProgress(updates: { subject_id: string; mark?: number[]; unmark?: number[] }[]): Promise<{ subject_id: string; status: string; detail?: string }[]> {
+        const res = await fetch(`${API_Base}/subjects/progress/bulk`, {
+            method: "POST",
+            headers: getHeaders(),
+            body: JSON.stringify({ updates }),
+        });
+        if (!res.ok) throw new Error("Failed to update progress");
+        const data = await res.json();
+        return data.results;
+    },
+
+    // One round trip for the dashboard's first pages; `fields` limits the sections returned
+    async getSummary(fields?: string[]): Promise<DashboardSummary> {
+        const query = fields?.length ? `?fields=${fields.join(",")}` : "";
+        const res = await fetch(`${API_Base}/summary${query}`, {
+            headers: getHeaders()
+        });
+        if (!res.ok) throw new Error("Failed to fetch dashboard summary");
+        return res.json();
     }
 };
@@ -1,4 +1,6 @@
 
+import { fetchAllPages } from '@/lib/pagination';
+
 export interface FeedbackAnalysis {
     good_things: string;
     bad_things: string;
@@ -16,6 +18,13 @@ export interface FeedbackItem {
     effectiveness?: "yes" | "no";
 }
 
+export interface AnalysisJob {
+    job_id: string;
+    status: "queued" | "running" | "done" | "failed";
+    result?: FeedbackItem;
+    error?: string;
+}
+
 const API_BASE = "/api/feedback";
 
 const getHeaders = () => {
@@ -25,13 +34,55 @@ const getHeaders = () => {
     };
 };
 
+const jobOutcome = (job: AnalysisJob): FeedbackItem | null => {
+    if (job.status === "done" && job.result) return job.result;
+    if (job.status === "failed") throw new Error(`Analysis failed: ${job.error ?? "unknown error"}`);
+    return null;
+};
+
+const pollJob = async (jobId: string): Promise<FeedbackItem> => {
+    for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        const res = await fetch(`${API_BASE}/jobs/${jobId}`, { headers: getHeaders() });
+        if (!res.ok) throw new Error(`Analysis failed: ${res.status}`);
+        const result = jobOutcome(await res.json());
+        if (result) return result;
+    }
+};
+
+// Follows a queued analysis over SSE, falling back to polling
+const waitForJob = (jobId: string): Promise<FeedbackItem> => {
+    if (typeof EventSource === 'undefined') return pollJob(jobId);
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_BASE}/jobs/${jobId}/stream`);
+        let settled = false;
+        source.addEventListener("status", (event) => {
+            try {
+                const result = jobOutcome(JSON.parse((event as MessageEvent).data));
+                if (result) {
+                    settled = true;
+                    source.close();
+                    resolve(result);
+                }
+            } catch (error) {
+                settled = true;
+                source.close();
+                reject(error);
+            }
+        });
+        source.onerror = () => {
+            source.close();
+            if (!settled) pollJob(jobId).then(resolve, reject);
+        };
+    });
+};
+
 export const FeedbackService = {
     async getList(): Promise<FeedbackItem[]> {
-        const res = await fetch(`${API_BASE}/list`, {
-            headers: { ...getHeaders(), "Content-Type": "application/json" }
+        const init = { headers: { ...getHeaders(), "Content-Type": "application/json" } };
+        return fetchAllPages<FeedbackItem>(`${API_BASE}/list`, init, () => {
+            throw new Error("Failed to fetch feedback");
         });
-        if (!res.ok) throw new Error("Failed to fetch feedback");
-        return res.json();
     },
 
     async analyze(text: string, language: string, feedbackId?: string): Promise<FeedbackItem> {
@@ -52,7 +103,9 @@ export const FeedbackService = {
             console.error("Analysis Error:", res.status, err);
             throw new Error(`Analysis failed: ${res.status} ${err}`);
         }
-        return res.json();
+        // The analysis runs as a background job; resolve once it has finished
+        const job: AnalysisJob = await res.json();
+        return jobOutcome(job) ?? waitForJob(job.job_id);
     },
 
     async rate(id: string, successful: boolean): Promise<void> {